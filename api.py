@@ -0,0 +1,230 @@
+import json
+from datetime import datetime
+from itertools import islice
+from flask import Blueprint, Response, request, current_app, abort, g
+from models import db, Venue, Artist, Show
+from queries import venue_detail, artist_detail, entity_page, show_page, entity_validator, listing_validator
+from search import search_by_name, search_all
+from conditional import conditional
+from scheduling import book_tour, SchedulingError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON mirror of the HTML pages, built on the same query layer, plus batch
+# booking of tours. Every list takes ?per_page= (capped at MAX_PER_PAGE) and
+# ?after= cursors, and every GET endpoint takes ?fields=a,b,c to return only
+# those keys.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+@api.before_request
+def use_replica():
+    # everything but tour booking is read-only
+    g.read_replica = request.method == 'GET'
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=lambda value: value.isoformat())
+
+
+def select_fields(item):
+    fields = request.args.get('fields')
+    if not fields:
+        return item
+    wanted = set(fields.split(','))
+    return dict((key, value) for key, value in item.items() if key in wanted)
+
+
+def respond(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def per_page():
+    value = request.args.get('per_page', current_app.config['API_PER_PAGE'], type=int)
+    return max(1, min(value, current_app.config['MAX_PER_PAGE']))
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return respond({"error": "not found"}, 404)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@conditional(lambda: listing_validator(Venue))
+def venues():
+    page = entity_page('venue', request.args.get('after', type=int), per_page())
+    return respond({
+        "data": [select_fields(venue) for venue in page['data']],
+        "next_cursor": page['next_cursor'],
+    })
+
+
+@api.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: entity_validator('venue', venue_id))
+def venue(venue_id):
+    data = venue_detail(venue_id)
+    if data is None:
+        abort(404)
+    return respond(select_fields(data))
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@conditional(lambda: listing_validator(Artist))
+def artists():
+    page = entity_page('artist', request.args.get('after', type=int), per_page())
+    return respond({
+        "data": [select_fields(artist) for artist in page['data']],
+        "next_cursor": page['next_cursor'],
+    })
+
+
+@api.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: entity_validator('artist', artist_id))
+def artist(artist_id):
+    data = artist_detail(artist_id)
+    if data is None:
+        abort(404)
+    return respond(select_fields(data))
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+@conditional(lambda: listing_validator(Show, Venue, Artist))
+def shows():
+    page = show_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page())
+    return respond({
+        "data": [select_fields(show) for show in page['shows']],
+        "next_cursor": page['next_cursor'],
+        "prev_cursor": page['prev_cursor'],
+    })
+
+
+#  Search
+#  ----------------------------------------------------------------
+
+@api.route('/search')
+def search():
+    # ?q=term searches everything; ?type=venue or ?type=artist searches
+    # names of that type only, like the HTML search pages
+    term = request.args.get('q', '')
+    kind = request.args.get('type')
+    limit = min(per_page(), current_app.config['SEARCH_LIMIT'])
+    if kind in ('venue', 'artist'):
+        results = {kind: search_by_name(kind, term, limit=limit)}
+    elif kind is None:
+        results = search_all(term, limit=limit)
+    else:
+        return respond({"error": "type must be venue or artist"}, 400)
+    return respond(dict((kind, {
+        "count": result['count'],
+        "more": result['more'],
+        "data": [select_fields(item) for item in result['data']],
+    }) for kind, result in results.items()))
+
+
+#  Typeahead
+#  ----------------------------------------------------------------
+
+@api.route('/typeahead/<kind>')
+def typeahead(kind):
+    # ?q=pref -> the first venues or artists whose name starts with it
+    if kind not in ('venue', 'artist'):
+        abort(404)
+    matches = current_app.extensions['typeahead'].lookup(kind, request.args.get('q', ''))
+    return respond({"data": matches})
+
+
+#  Tours
+#  ----------------------------------------------------------------
+
+def parse_date(row):
+    # (venue_id, start_time) from {"venue_id": 1, "start_time": "2023-05-01T20:00"}
+    venue_id = row.get('venue_id') if isinstance(row, dict) else None
+    if not isinstance(venue_id, int) or isinstance(venue_id, bool):
+        raise ValueError('venue_id must be an integer')
+    try:
+        start_time = datetime.fromisoformat(row.get('start_time'))
+    except (TypeError, ValueError):
+        raise ValueError('start_time must be an ISO date and time')
+    return venue_id, start_time.replace(tzinfo=None)
+
+
+def tour_dates(payload, limit):
+    # explicit dates, or an RFC 5545 rule at one venue:
+    # {"venue_id": 1, "start_time": "2023-05-05T21:00", "rule": "FREQ=WEEKLY;COUNT=8"}
+    if 'shows' in payload:
+        if not isinstance(payload['shows'], list):
+            raise ValueError('shows must be a list')
+        rows = payload['shows']
+    elif isinstance(payload.get('recurrence'), dict):
+        venue_id, start_time = parse_date(payload['recurrence'])
+        # imported here, like the datetime filter's dateutil.parser
+        from dateutil.rrule import rrulestr
+        try:
+            rule = rrulestr(payload['recurrence'].get('rule') or '', dtstart=start_time)
+        except (TypeError, ValueError):
+            raise ValueError('recurrence.rule must be an RFC 5545 RRULE')
+        return [(venue_id, occurrence) for occurrence in islice(rule, limit + 1)]
+    else:
+        raise ValueError('give either shows or recurrence')
+    dates = []
+    for row in rows[:limit + 1]:
+        try:
+            dates.append(parse_date(row))
+        except ValueError as error:
+            dates.append(error)
+    return dates
+
+
+@api.route('/tours', methods=['POST'])
+def book():
+    # Book one artist for many dates at once. Each date gets a result, in
+    # order: "created" with its show_id, or "rejected" with the reason. With
+    # "atomic": true nothing is created unless every date can be.
+    payload = request.get_json(silent=True)
+    artist_id = payload.get('artist_id') if isinstance(payload, dict) else None
+    if not isinstance(artist_id, int) or isinstance(artist_id, bool):
+        return respond({"error": "artist_id must be an integer"}, 400)
+    limit = current_app.config['MAX_TOUR_SHOWS']
+    try:
+        dates = tour_dates(payload, limit)
+    except ValueError as error:
+        return respond({"error": str(error)}, 400)
+    if not dates or len(dates) > limit:
+        return respond({"error": "a tour has between 1 and %d shows" % limit}, 400)
+    try:
+        results = book_tour(payload['artist_id'], [
+            None if isinstance(date, ValueError) else date for date in dates
+        ], atomic=bool(payload.get('atomic')))
+        db.session.commit()
+    except SchedulingError:
+        db.session.rollback()
+        return respond({"error": "no such artist"}, 404)
+    for result, date in zip(results, dates):
+        if isinstance(date, ValueError):
+            result['message'] = str(date)
+        else:
+            result.update(venue_id=date[0], start_time=date[1])
+    created = [result for result in results if result['status'] == 'created']
+    if created:
+        current_app.extensions['cache'].shows_changed(
+            [result['venue_id'] for result in created], [payload['artist_id']])
+    status = 201 if len(created) == len(results) else 207 if created else 422
+    return respond({"created": len(created), "results": results}, status)
@@ -0,0 +1,181 @@
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app
+from models import db, Artist
+from forms import ArtistForm
+from queries import artist_detail, artist_index, entity_validator, listing_validator, LETTERS
+from search import search_by_name
+from conditional import conditional
+from database import read_only
+from streaming import stream_page
+from extensions import cache
+
+artists = Blueprint('artists', __name__, url_prefix='/artists')
+
+
+@artists.route('')
+@read_only
+@conditional(lambda: listing_validator(Artist))
+@cache.cached('artists', query_string=True)
+def index():
+    per_page = min(
+        request.args.get('per_page', current_app.config['ARTISTS_PER_PAGE'], type=int),
+        current_app.config['MAX_PER_PAGE'])
+    seeking_venue = True if request.args.get('seeking') else None
+    page = artist_index(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        letter=request.args.get('letter'),
+        state=request.args.get('state') or None,
+        seeking_venue=seeking_venue,
+        per_page=max(per_page, 1))
+    return stream_page('pages/artists.html', page=page, letters=LETTERS,
+                       states=[value for value, label in ArtistForm.state.kwargs['choices']])
+
+
+@artists.route('/search', methods=['POST'])
+@read_only
+def search():
+    results = search_by_name('artist', request.form.get('search_term', ''),
+                             limit=current_app.config['SEARCH_LIMIT'])
+    return render_template('pages/search_artists.html', results=results, search_term=request.form.get('search_term', ''))
+
+
+@artists.route('/<int:artist_id>')
+@read_only
+@conditional(lambda artist_id: entity_validator('artist', artist_id))
+@cache.cached('artist:{artist_id}')
+def show(artist_id):
+    data = artist_detail(artist_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@artists.route('/<int:artist_id>/edit', methods=['GET'])
+def edit(artist_id):
+    artist_select = Artist.query.get(artist_id)
+    form = ArtistForm()
+    artist = {
+        "id": artist_select.id,
+        "name": artist_select.name,
+        "genres": artist_select.genres,
+        "city": artist_select.city,
+        "state": artist_select.state,
+        "phone": artist_select.phone,
+        "website": artist_select.website_link,
+        "facebook_link": artist_select.facebook_link,
+        "seeking_venue": artist_select.seeking_venue,
+        "seeking_description": artist_select.seeking_description,
+        "image_link": artist_select.image_link
+    }
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artists.route('/<int:artist_id>/edit', methods=['POST'])
+def edit_submission(artist_id):
+    try:
+        form = ArtistForm()
+        if form.validate_on_submit():
+            artist = Artist.query.get(artist_id)
+            if form.seeking_venue.data:
+                artist.name = form.name.data
+                artist.city = form.city.data
+                artist.state = form.state.data
+                artist.phone = form.phone.data
+                artist.genres = form.genres.data
+                artist.facebook_link = form.facebook_link.data
+                artist.image_link = form.image_link.data
+                artist.website_link = form.website_link.data
+                artist.seeking_venue = form.seeking_venue.data
+                artist.seeking_description = form.seeking_description.data
+                db.session.add(artist)
+                db.session.commit()
+                cache.artist_changed(artist_id)
+                flash('Artist ' + form.name.data + ' a été mis à jour')
+                return redirect(url_for('artists.show', artist_id=artist_id))
+            else:
+                artist.name = form.name.data
+                artist.city = form.city.data
+                artist.state = form.state.data
+                artist.phone = form.phone.data
+                artist.genres = form.genres.data
+                artist.facebook_link = form.facebook_link.data
+                artist.image_link = form.image_link.data
+                artist.website_link = form.website_link.data
+                artist.seeking_description = form.seeking_description.data
+                db.session.add(artist)
+                db.session.commit()
+            cache.artist_changed(artist_id)
+            flash('Artist ' + form.name.data + ' a été mis à jour')
+            return redirect(url_for('artists.show', artist_id=artist_id))
+        else:
+            return render_template('forms/edit_artist.html', form=form)
+    except:
+        print(sys.exc_info())
+        db.session.rollback()
+        flash('Artist ' + form.name.data +
+              ' n\'a pas été mise à jour. Une erreur s\'est produite.')
+    finally:
+        db.session.close()
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artists.route('/create', methods=['GET'])
+def create_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists.route('/create', methods=['POST'])
+def create_submission():
+    try:
+        form = ArtistForm()
+        if form.validate_on_submit():
+            if form.seeking_venue.data:
+                artist = Artist(
+                    name=form.name.data,
+                    city=form.city.data,
+                    state=form.state.data,
+                    phone=form.phone.data,
+                    genres=form.genres.data,
+                    facebook_link=form.facebook_link.data,
+                    image_link=form.image_link.data,
+                    website_link=form.website_link.data,
+                    seeking_venue=form.seeking_venue.data,
+                    seeking_description=form.seeking_description.data,)
+                db.session.add(artist)
+                db.session.commit()
+            else:
+                artist = Artist(
+                    name=form.name.data,
+                    city=form.city.data,
+                    state=form.state.data,
+                    phone=form.phone.data,
+                    genres=form.genres.data,
+                    facebook_link=form.facebook_link.data,
+                    image_link=form.image_link.data,
+                    website_link=form.website_link.data,
+                    seeking_description=form.seeking_description.data,)
+                db.session.add(artist)
+                db.session.commit()
+            cache.artist_changed()
+            # on successful db insert, flash success
+            flash('Artist ' + form.name.data + ' a été ajouté')
+        else:
+            return render_template('submit.html', form=form)
+    except:
+        print(sys.exc_info())
+        db.session.rollback()
+        flash('Artist ' + form.name.data +
+              ' n\'a pas été crée. Une erreur s\'est produite.')
+    finally:
+        db.session.close()
+    # on successful db insert, flash success
+    # TODO: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+    return render_template('pages/home.html')
@@ -0,0 +1,219 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Static assets. `flask assets build` concatenates the stylesheets and
+# scripts of each bundle below into one file, minifies the sources that
+# aren't minified yet, names the result after a hash of its content
+# (static/dist/main.<hash>.css) and writes .gz and .br copies next to it.
+# static/dist/manifest.json maps every bundle and fingerprinted file to its
+# hashed name.
+#
+# In templates, asset_urls('main.css') gives the bundle's URL once built,
+# or the URLs of its sources, one by one, in debug mode or before any
+# build (edits to the sources then show up without rebuilding);
+# asset_url('img/front-splash.jpg') does the same for a single file.
+#
+# Hashed files never change, so the static route serves them with a one
+# year, immutable Cache-Control, and sends the .br or .gz copy to clients
+# accepting it. Builds from earlier deploys are left in place, for pages
+# still open on them.
+
+DIST = 'dist'
+
+# dist/ sits next to css/, so the relative url()s in the stylesheets
+# (../fonts/...) resolve the same from a bundle
+BUNDLES = {
+    'main.css': (
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ),
+    'form.css': (
+        'css/bootstrap.min.css',
+        'css/bootstrap-theme.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ),
+    # loaded in <head>, before the page renders
+    'head.js': (
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ),
+    # deferred, in this order
+    'main.js': (
+        'js/libs/jquery-1.11.1.min.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+        'js/script.js',
+    ),
+}
+
+# fingerprinted but served on their own
+FILES = (
+    'js/libs/respond-1.4.2.min.js',
+    'img/front-splash.jpg',
+)
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+SOURCE_MAP = re.compile(r'^\s*(//|/\*)[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+
+def minify(path, text):
+    # already minified sources only lose their source map comment, which
+    # would point the browser at a map of the wrong file
+    if '.min.' in os.path.basename(path):
+        return SOURCE_MAP.sub('', text).strip()
+    if path.endswith('.css'):
+        from rcssmin import cssmin
+        return cssmin(text)
+    from rjsmin import jsmin
+    return jsmin(text)
+
+
+def bundle(static_folder, name, sources):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(minify(source, f.read()))
+    # a script without its final semicolon must not run into the next one
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return separator.join(parts).encode('utf-8')
+
+
+def hashed_name(path, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(path)
+    return '%s.%s%s' % (stem, digest, ext)
+
+
+def write(static_folder, name, content, brotli_quality):
+    # returns the sizes written; a file already there is the same content
+    path = os.path.join(static_folder, DIST, name)
+    sizes = {'': len(content)}
+    variants = [('', lambda data: data)]
+    if name.endswith(COMPRESSIBLE):
+        variants.append(('.gz', lambda data: gzip.compress(data, 9, mtime=0)))
+        if brotli is not None:
+            variants.append(('.br', lambda data: brotli.compress(data, quality=brotli_quality)))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for suffix, encode in variants:
+        if os.path.exists(path + suffix):
+            sizes[suffix] = os.path.getsize(path + suffix)
+            continue
+        data = encode(content)
+        # written aside and renamed, so a worker never serves half a file
+        with open(path + suffix + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + suffix + '.tmp', path + suffix)
+        sizes[suffix] = len(data)
+    return sizes
+
+
+class Assets(object):
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.bundled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.bundled = app.config.get('ASSETS_BUNDLED', not app.debug)
+        self.max_age = app.config.get('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        self.brotli_quality = app.config.get('ASSETS_BROTLI_QUALITY', 11)
+        self.manifest = self.load()
+        app.extensions['assets'] = self
+        app.add_template_global(self.asset_url)
+        app.add_template_global(self.asset_urls)
+        app.view_functions['static'] = self.send_static_file
+        app.cli.add_command(assets_command)
+
+    def load(self):
+        try:
+            with open(os.path.join(self.static_folder, DIST, 'manifest.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def build(self):
+        # returns (name, hashed name, sizes) for every file
+        manifest = {}
+        built = []
+        outputs = [(name, bundle(self.static_folder, name, sources))
+                   for name, sources in BUNDLES.items()]
+        for path in FILES:
+            with open(os.path.join(self.static_folder, path), 'rb') as f:
+                content = f.read()
+            if path.endswith(COMPRESSIBLE):
+                content = minify(path, content.decode('utf-8')).encode('utf-8')
+            outputs.append((path, content))
+        for name, content in outputs:
+            manifest[name] = hashed_name(name, content)
+            built.append((name, manifest[name], write(
+                self.static_folder, manifest[name], content, self.brotli_quality)))
+        path = os.path.join(self.static_folder, DIST, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+        self.manifest = manifest
+        return built
+
+    def asset_url(self, path):
+        if self.bundled and path in self.manifest:
+            return url_for('static', filename=DIST + '/' + self.manifest[path])
+        return url_for('static', filename=path)
+
+    def asset_urls(self, name):
+        if self.bundled and name in self.manifest:
+            return [url_for('static', filename=DIST + '/' + self.manifest[name])]
+        return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+    def send_static_file(self, filename):
+        if not filename.startswith(DIST + '/') or filename.endswith('manifest.json'):
+            return current_app.send_static_file(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        path, encoding = filename, None
+        for suffix, candidate in (('.br', 'br'), ('.gz', 'gzip')):
+            if accepted[candidate] and os.path.isfile(
+                    os.path.join(self.static_folder, filename + suffix)):
+                path, encoding = filename + suffix, candidate
+                break
+        response = send_from_directory(
+            self.static_folder, path, mimetype=mimetype, max_age=self.max_age,
+            download_name=os.path.basename(filename))
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if filename.endswith(COMPRESSIBLE):
+            response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+
+assets_command = AppGroup('assets', help='Build the static asset bundles.')
+
+
+@assets_command.command('build')
+def build_command():
+    """Bundle, minify, fingerprint and precompress the static assets."""
+    for name, hashed, sizes in current_app.extensions['assets'].build():
+        click.echo('%s -> %s/%s (%s)' % (name, DIST, hashed, ', '.join(
+            '%s %d' % (suffix.lstrip('.') or 'raw', size) for suffix, size in sizes.items())))
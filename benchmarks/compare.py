@@ -0,0 +1,51 @@
+import json
+import sys
+import click
+
+# Compares two benchmarks.run result files route by route:
+#
+#     python -m benchmarks.compare before.json after.json --threshold 10
+#
+# Exits with status 1 when a route's p95 latency got worse by more than
+# --threshold percent, or when it runs more queries than before.
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kib')
+
+
+def change(before, after):
+    if not before:
+        return 0.0 if not after else float('inf')
+    return (after - before) * 100.0 / before
+
+
+@click.command()
+@click.argument('before', type=click.File())
+@click.argument('after', type=click.File())
+@click.option('--threshold', default=10.0, show_default=True, help='Allowed p95 slowdown, in percent.')
+def compare(before, after, threshold):
+    """Compare two benchmark result files."""
+    before, after = json.load(before), json.load(after)
+    for side, report in (('before', before), ('after', after)):
+        meta = report['meta']
+        click.echo('%-6s %s%s  %s' % (side, (meta['commit'] or 'unknown')[:10],
+                                      ' (dirty)' if meta['dirty'] else '', meta['dataset']))
+    if before['meta']['dataset'] != after['meta']['dataset']:
+        click.echo('warning: the datasets differ', err=True)
+    click.echo('%-26s %s' % ('route', ''.join('%22s' % metric for metric in METRICS)))
+    regressions = []
+    for endpoint in sorted(set(before['routes']) & set(after['routes'])):
+        old, new = before['routes'][endpoint], after['routes'][endpoint]
+        cells = ''.join('%22s' % ('%.1f -> %.1f %+.0f%%' % (old[metric], new[metric], change(old[metric], new[metric])))
+                        for metric in METRICS)
+        click.echo('%-26s %s' % (endpoint, cells))
+        if change(old['p95_ms'], new['p95_ms']) > threshold or new['queries'] > old['queries']:
+            regressions.append(endpoint)
+    for endpoint in sorted(set(before['routes']) ^ set(after['routes'])):
+        click.echo('%-26s only in %s' % (endpoint, 'before' if endpoint in before['routes'] else 'after'))
+    if regressions:
+        click.echo('regressions: %s' % ', '.join(regressions), err=True)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    compare()
@@ -0,0 +1,148 @@
+import random
+from datetime import datetime, timedelta
+import click
+from app import create_app
+from models import db, Artist, Venue, Show
+from forms import VenueForm
+from counters import recount
+
+# Synthetic data for the benchmarks: N venues, M artists and K shows, with
+# the skew of real listings. A few cities hold most venues and artists, a
+# few genres dominate, and popular venues and artists get most of the shows
+# (Zipf-like weights). The same --seed always produces the same data.
+#
+#     python -m benchmarks.generate --venues 2000 --artists 5000 --shows 50000
+#
+# Replaces everything in the database DATABASE_URL points at.
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('San Francisco', 'CA'), ('Austin', 'TX'), ('Nashville', 'TN'),
+    ('Seattle', 'WA'), ('New Orleans', 'LA'), ('Atlanta', 'GA'),
+    ('Boston', 'MA'), ('Denver', 'CO'), ('Portland', 'OR'),
+    ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+    ('Miami', 'FL'), ('Memphis', 'TN'), ('Phoenix', 'AZ'),
+    ('Kansas City', 'MO'), ('Salt Lake City', 'UT'),
+]
+
+GENRES = [value for value, label in VenueForm.genres.kwargs['choices']]
+
+ADJECTIVES = ['Blue', 'Velvet', 'Golden', 'Electric', 'Silver', 'Midnight',
+              'Crimson', 'Lucky', 'Wild', 'Copper', 'Neon', 'Hollow']
+NOUNS = ['Room', 'Hall', 'Lounge', 'Tavern', 'Garden', 'Warehouse',
+         'Theatre', 'Club', 'Cellar', 'Barn', 'Pavilion', 'Den']
+BANDS = ['Owls', 'Rivers', 'Machines', 'Saints', 'Foxes', 'Echoes',
+         'Drifters', 'Lanterns', 'Wolves', 'Comets', 'Strangers', 'Kites']
+
+BATCH = 1000
+
+
+def zipf(n, s=1.1):
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def pick_genres(rng, weights):
+    return sorted(set(rng.choices(GENRES, weights, k=rng.randint(1, 3))))
+
+
+def insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(model.__table__.insert(), rows[start:start + BATCH])
+
+
+def venue_rows(rng, count, city_weights, genre_weights):
+    rows = []
+    for number in range(1, count + 1):
+        city, state = rng.choices(CITIES, city_weights)[0]
+        seeking = rng.random() < 0.3
+        rows.append({
+            'name': 'The %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(NOUNS), number),
+            'city': city,
+            'state': state,
+            'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(ADJECTIVES)),
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+            'genres': pick_genres(rng, genre_weights),
+            'facebook_link': 'https://www.facebook.com/venue%d' % number,
+            'image_link': 'https://images.example.com/venues/%d.jpg' % number,
+            'website_link': 'https://venue%d.example.com' % number,
+            'seeking_talent': seeking,
+            'seeking_description': 'Looking for local acts.' if seeking else None,
+        })
+    return rows
+
+
+def artist_rows(rng, count, city_weights, genre_weights):
+    rows = []
+    for number in range(1, count + 1):
+        city, state = rng.choices(CITIES, city_weights)[0]
+        seeking = rng.random() < 0.4
+        rows.append({
+            'name': '%s %s %d' % (rng.choice(ADJECTIVES), rng.choice(BANDS), number),
+            'city': city,
+            'state': state,
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+            'genres': pick_genres(rng, genre_weights),
+            'facebook_link': 'https://www.facebook.com/artist%d' % number,
+            'image_link': 'https://images.example.com/artists/%d.jpg' % number,
+            'website_link': 'https://artist%d.example.com' % number,
+            'seeking_venue': seeking,
+            'seeking_description': 'Looking for shows.' if seeking else None,
+        })
+    return rows
+
+
+def show_rows(rng, count, venues, artists, now):
+    # popularity is independent of id order
+    venue_ids = list(range(1, venues + 1))
+    artist_ids = list(range(1, artists + 1))
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+    venue_weights = zipf(venues, 0.9)
+    artist_weights = zipf(artists, 0.9)
+    picked_venues = rng.choices(venue_ids, venue_weights, k=count)
+    picked_artists = rng.choices(artist_ids, artist_weights, k=count)
+    rows = []
+    for venue_id, artist_id in zip(picked_venues, picked_artists):
+        # two thirds in the past year, the rest in the next six months
+        day = rng.randint(-365, 180)
+        start_time = (now + timedelta(days=day)).replace(
+            hour=rng.choice([18, 19, 20, 21, 22]), minute=rng.choice([0, 30]),
+            second=0, microsecond=0)
+        rows.append({
+            'venues_id': venue_id,
+            'artists_id': artist_id,
+            'start_time': start_time,
+            'counted_past': start_time < now,
+        })
+    return rows
+
+
+@click.command()
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=2000, show_default=True)
+@click.option('--shows', default=20000, show_default=True)
+@click.option('--seed', default=1, show_default=True)
+@click.option('--yes', is_flag=True, help='Do not ask before replacing the data.')
+def generate(venues, artists, shows, seed, yes):
+    """Replace the database contents with synthetic data."""
+    url = db.engine.url.render_as_string(hide_password=True)
+    if not yes:
+        click.confirm('Replace all venues, artists and shows in %s?' % url, abort=True)
+    rng = random.Random(seed)
+    city_weights = zipf(len(CITIES))
+    genre_weights = zipf(len(GENRES))
+    rng.shuffle(genre_weights)
+    db.session.execute(db.text('TRUNCATE shows, venues, artists RESTART IDENTITY CASCADE'))
+    insert(Venue, venue_rows(rng, venues, city_weights, genre_weights))
+    insert(Artist, artist_rows(rng, artists, city_weights, genre_weights))
+    insert(Show, show_rows(rng, shows, venues, artists, datetime.now()))
+    # the inserts bypass the ORM events that keep the counters
+    recount(Venue)
+    recount(Artist)
+    db.session.commit()
+    click.echo('%d venues, %d artists and %d shows written to %s' % (venues, artists, shows, url))
+
+
+if __name__ == '__main__':
+    with create_app().app_context():
+        generate()
@@ -0,0 +1,285 @@
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app
+from models import db, Artist, Venue, Show
+from cache import NullCache
+
+# Benchmarks every route through the Flask test client, against whatever
+# database DATABASE_URL points at (fill it with benchmarks.generate first).
+# For each route: latency percentiles over --iterations requests, SQL
+# statements per request, and peak Python memory allocated by one request.
+# Results go to a JSON file that benchmarks.compare diffs against another.
+#
+#     python -m benchmarks.run --iterations 200 -o before.json
+#
+# The page cache is off unless --cache is given, so the numbers are those of
+# a cold page. Routes that write are only run with --writes.
+
+SEARCH_TERMS = ['the', 'blue', 'jazz', 'rock', 'New York, NY', 'Seattle, WA', 'xyz']
+
+PREFIXES = ['t', 'th', 'the', 'the b', 'm', 'mid', 'midnight', 'x']
+
+
+class Sample(object):
+    # ids and values the route arguments are drawn from
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.venue_ids = [row.id for row in db.session.query(Venue.id)]
+        self.artist_ids = [row.id for row in db.session.query(Artist.id)]
+
+    def venue_id(self):
+        return self.rng.choice(self.venue_ids)
+
+    def artist_id(self):
+        return self.rng.choice(self.artist_ids)
+
+    def term(self):
+        return self.rng.choice(SEARCH_TERMS)
+
+    def prefix(self):
+        return self.rng.choice(PREFIXES)
+
+    def venue_form(self, venue_id=None):
+        venue = Venue.query.get(venue_id or self.venue_id())
+        return {
+            'name': venue.name, 'city': venue.city, 'state': venue.state,
+            'address': venue.address, 'phone': venue.phone or '',
+            'genres': venue.genres, 'facebook_link': venue.facebook_link,
+            'image_link': venue.image_link or '', 'website_link': venue.website_link or '',
+            'seeking_talent': 'y' if venue.seeking_talent else '',
+            'seeking_description': venue.seeking_description or '',
+        }
+
+    def artist_form(self, artist_id=None):
+        artist = Artist.query.get(artist_id or self.artist_id())
+        return {
+            'name': artist.name, 'city': artist.city, 'state': artist.state,
+            'phone': artist.phone or '', 'genres': artist.genres,
+            'facebook_link': artist.facebook_link,
+            'image_link': artist.image_link or '', 'website_link': artist.website_link or '',
+            'seeking_venue': 'y' if artist.seeking_venue else '',
+            'seeking_description': artist.seeking_description or '',
+        }
+
+    def show_form(self):
+        start_time = datetime.now() + timedelta(days=self.rng.randint(1, 180))
+        return {
+            'venue_id': str(self.venue_id()),
+            'artist_id': str(self.artist_id()),
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def edit_venue(sample):
+    venue_id = sample.venue_id()
+    return '/venues/%d/edit' % venue_id, sample.venue_form(venue_id)
+
+
+def edit_artist(sample):
+    artist_id = sample.artist_id()
+    return '/artists/%d/edit' % artist_id, sample.artist_form(artist_id)
+
+
+def tour(sample):
+    # ten dates a day apart, far enough out not to clash with earlier runs
+    start = datetime.now() + timedelta(days=sample.rng.randint(400, 4000))
+    return '/api/v1/tours', {"artist_id": sample.artist_id(), "shows": [
+        {"venue_id": sample.venue_id(), "start_time": (start + timedelta(days=day)).isoformat()}
+        for day in range(10)]}
+
+
+def oldest_shows_page(sample):
+    # deep in the feed, where offset pagination used to hurt
+    oldest = db.session.query(Show.start_time, Show.id).order_by(
+        Show.start_time, Show.id).offset(30).first()
+    return '/shows?after=%s_%d' % (oldest.start_time.isoformat(), oldest.id), None
+
+
+# endpoint: (method, writes, request builder returning (path, form data))
+ROUTES = {
+    'index': ('GET', False, lambda sample: ('/', None)),
+    'search': ('POST', False, lambda sample: ('/search', {'search_term': sample.term()})),
+    'venues.index': ('GET', False, lambda sample: ('/venues', None)),
+    'venues.search': ('POST', False, lambda sample: ('/venues/search', {'search_term': sample.term()})),
+    'venues.show': ('GET', False, lambda sample: ('/venues/%d' % sample.venue_id(), None)),
+    'venues.create_form': ('GET', False, lambda sample: ('/venues/create', None)),
+    'venues.create_submission': ('POST', True, lambda sample: ('/venues/create', sample.venue_form())),
+    'artists.index': ('GET', False, lambda sample: ('/artists', None)),
+    'artists.search': ('POST', False, lambda sample: ('/artists/search', {'search_term': sample.term()})),
+    'artists.show': ('GET', False, lambda sample: ('/artists/%d' % sample.artist_id(), None)),
+    'artists.edit': ('GET', False, lambda sample: ('/artists/%d/edit' % sample.artist_id(), None)),
+    'artists.edit_submission': ('POST', True, edit_artist),
+    'venues.edit': ('GET', False, lambda sample: ('/venues/%d/edit' % sample.venue_id(), None)),
+    'venues.edit_submission': ('POST', True, edit_venue),
+    'artists.create_form': ('GET', False, lambda sample: ('/artists/create', None)),
+    'artists.create_submission': ('POST', True, lambda sample: ('/artists/create', sample.artist_form())),
+    'shows.index': ('GET', False, lambda sample: ('/shows', None)),
+    'shows_deep': ('GET', False, oldest_shows_page),
+    'shows.create_form': ('GET', False, lambda sample: ('/shows/create', None)),
+    'shows.create_submission': ('POST', True, lambda sample: ('/shows/create', sample.show_form())),
+    'healthz': ('GET', False, lambda sample: ('/healthz', None)),
+    'api.venues': ('GET', False, lambda sample: ('/api/v1/venues', None)),
+    'api.venue': ('GET', False, lambda sample: ('/api/v1/venues/%d' % sample.venue_id(), None)),
+    'api.artists': ('GET', False, lambda sample: ('/api/v1/artists', None)),
+    'api.artist': ('GET', False, lambda sample: ('/api/v1/artists/%d' % sample.artist_id(), None)),
+    'api.shows': ('GET', False, lambda sample: ('/api/v1/shows', None)),
+    'api.search': ('GET', False, lambda sample: ('/api/v1/search?q=%s' % sample.term(), None)),
+    'api.book': ('POST', True, tour),
+    'api.typeahead': ('GET', False, lambda sample: ('/api/v1/typeahead/%s?q=%s' % (
+        sample.rng.choice(['venue', 'artist']), sample.prefix()), None)),
+    'export.download': ('GET', False, lambda sample: ('/export/shows.jsonl', None)),
+}
+
+# not benchmarked: static files, and venues.delete, which is a stub
+SKIPPED = {'static', 'venues.delete'}
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'after_cursor_execute', self.executed)
+
+    def executed(self, *args):
+        self.count += 1
+
+
+def percentile(values, fraction):
+    # nearest rank
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def call(client, method, path, data):
+    if path.startswith('/api/'):
+        response = client.open(path, method=method, json=data)
+    else:
+        response = client.open(path, method=method, data=data)
+    response.get_data()  # drain streamed bodies
+    return response
+
+
+def bench_route(client, sample, counter, method, build, iterations, warmup):
+    requests = [build(sample) for i in range(warmup + iterations)]
+    db.session.remove()
+    timings = []
+    queries = []
+    statuses = set()
+    for i, (path, data) in enumerate(requests):
+        before = counter.count
+        started = time.perf_counter()
+        response = call(client, method, path, data)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(counter.count - before)
+            statuses.add(response.status_code)
+    # memory in a separate pass, tracing slows everything down
+    path, data = requests[-1]
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    call(client, method, path, data)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "method": method,
+        "path": path,
+        "statuses": sorted(statuses),
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p90_ms": round(percentile(timings, 0.90), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+        "peak_kib": round(peak / 1024.0, 1),
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+@click.command()
+@click.option('--iterations', '-n', default=100, show_default=True, help='Timed requests per route.')
+@click.option('--warmup', default=5, show_default=True, help='Untimed requests per route first.')
+@click.option('--route', 'only', multiple=True, help='Only these endpoints (repeatable).')
+@click.option('--writes', is_flag=True, help='Also run the routes that create and edit rows.')
+@click.option('--cache', 'use_cache', is_flag=True, help='Leave the page cache on.')
+@click.option('--seed', default=1, show_default=True)
+@click.option('--output', '-o', default=None, help='Defaults to benchmark-<commit>.json.')
+def run(iterations, warmup, only, writes, use_cache, seed, output):
+    """Benchmark every route and write the results as JSON."""
+    app = create_app()
+    missing = set(rule.endpoint for rule in app.url_map.iter_rules()) - set(ROUTES) - SKIPPED
+    if missing:
+        click.echo('not benchmarked, add them to ROUTES: %s' % ', '.join(sorted(missing)), err=True)
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not use_cache:
+        app.extensions['cache'].backend = NullCache()
+    client = app.test_client()
+    counter = QueryCounter()
+    failed = []
+    results = {}
+    with app.app_context():
+        sample = Sample(random.Random(seed))
+        dataset = dict((model.__tablename__, db.session.query(model).count())
+                       for model in (Venue, Artist, Show))
+        database = db.engine.url.render_as_string(hide_password=True)
+        db.session.remove()
+    for endpoint, (method, writing, build) in ROUTES.items():
+        if (only and endpoint not in only) or (writing and not writes):
+            continue
+        with app.app_context():
+            result = bench_route(client, sample, counter, method, build, iterations, warmup)
+        results[endpoint] = result
+        if any(status >= 400 for status in result['statuses']):
+            failed.append(endpoint)
+        click.echo('%-26s p50 %8.2fms  p95 %8.2fms  p99 %8.2fms  %6.1f queries  %8.1f KiB' % (
+            endpoint, result['p50_ms'], result['p95_ms'], result['p99_ms'],
+            result['queries'], result['peak_kib']))
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database,
+            "dataset": dataset,
+            "iterations": iterations,
+            "warmup": warmup,
+            "cache": use_cache,
+            "seed": seed,
+        },
+        "routes": results,
+    }
+    output = output or 'benchmark-%s.json' % ((commit or 'unknown')[:10] + ('-dirty' if dirty else ''))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    click.echo('results written to %s' % output)
+    if failed:
+        click.echo('error responses from: %s' % ', '.join(failed), err=True)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,138 @@
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+import click
+from benchmarks.run import git_revision, percentile
+
+# Startup cost: how long a fresh interpreter takes to import app.py, build
+# the app with create_app() and serve its first request, which every worker
+# spawn, CLI command and test run pays. Each run is a new process, so the
+# import cache is cold every time.
+#
+#     python -m benchmarks.startup --runs 20 -o startup-before.json
+#     python -m benchmarks.startup --runs 20 --against startup-before.json
+#
+# The modules with the largest cumulative import time (python -X importtime)
+# are listed, and the run fails if a module in DEFERRED was imported at
+# startup, or with --against when the median total got slower by more than
+# --threshold percent.
+
+# only needed on some paths, and imported there
+DEFERRED = ('flask_migrate', 'alembic', 'dateutil')
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+application.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "modules": sorted(sys.modules),
+}))
+'''
+
+PHASES = ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')
+
+
+def measure():
+    started = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', CHILD], stderr=subprocess.DEVNULL, text=True)
+    sample = json.loads(output.splitlines()[-1])
+    # interpreter startup and teardown included
+    sample['process_ms'] = (time.perf_counter() - started) * 1000
+    sample['total_ms'] = sample['import_ms'] + sample['create_app_ms'] + sample['first_request_ms']
+    return sample
+
+
+def import_times(top):
+    # (module, cumulative microseconds) for the costliest top-level imports
+    # of app.py; -X importtime reports on stderr
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True).stderr
+    times = {}
+    children = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        # a module is listed after its imports, indented two spaces less
+        if not name.startswith('   '):
+            if name.strip() == 'app':
+                times = children
+            children = {}
+        elif not name.startswith('    '):
+            children[name.strip()] = int(cumulative)
+    return sorted(times.items(), key=lambda item: -item[1])[:top]
+
+
+@click.command()
+@click.option('--runs', '-n', default=10, show_default=True, help='Fresh processes to time.')
+@click.option('--top', default=15, show_default=True, help='Costliest imports to list.')
+@click.option('--output', '-o', default=None, help='Defaults to startup-<commit>.json.')
+@click.option('--against', type=click.File(), default=None, help='Earlier results to compare with.')
+@click.option('--threshold', default=10.0, show_default=True, help='Allowed slowdown, in percent.')
+def startup(runs, top, output, against, threshold):
+    """Time importing and creating the app in fresh processes."""
+    samples = [measure() for i in range(runs)]
+    results = {}
+    for phase in PHASES + ('process_ms',):
+        values = [sample[phase] for sample in samples]
+        results[phase] = {
+            "p50": round(percentile(values, 0.50), 1),
+            "min": round(min(values), 1),
+            "max": round(max(values), 1),
+        }
+        click.echo('%-18s p50 %8.1fms  min %8.1fms  max %8.1fms' % (
+            phase, results[phase]['p50'], results[phase]['min'], results[phase]['max']))
+    modules = import_times(top)
+    click.echo('costliest imports:')
+    for name, cumulative in modules:
+        click.echo('  %-30s %8.1fms' % (name, cumulative / 1000.0))
+    loaded = [name for name in DEFERRED if name in samples[-1]['modules']]
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+        },
+        "startup": results,
+        "modules": len(samples[-1]['modules']),
+        "imports": [{"module": name, "cumulative_ms": round(cumulative / 1000.0, 1)}
+                    for name, cumulative in modules],
+        "deferred_loaded": loaded,
+    }
+    output = output or 'startup-%s.json' % ((commit or 'unknown')[:10] + ('-dirty' if dirty else ''))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    click.echo('%d modules loaded, results written to %s' % (report['modules'], output))
+    failed = False
+    if loaded:
+        click.echo('imported at startup, should be deferred: %s' % ', '.join(loaded), err=True)
+        failed = True
+    if against is not None:
+        before = json.load(against)['startup']['total_ms']['p50']
+        after = results['total_ms']['p50']
+        change = (after - before) * 100.0 / before
+        click.echo('total p50 %.1fms -> %.1fms %+.0f%%' % (before, after, change))
+        if change > threshold:
+            click.echo('startup got slower by more than %.0f%%' % threshold, err=True)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    startup()
@@ -0,0 +1,220 @@
+import csv
+import json
+import os
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import DataError, IntegrityError
+from werkzeug.datastructures import MultiDict
+from models import db, Artist, Venue, Show
+from forms import VenueForm, ArtistForm, ShowForm
+from counters import recount
+from scheduling import check_batch
+
+# Bulk import of venues, artists and shows from CSV or JSONL files.
+#
+# Rows are streamed from the file, validated with the same forms the
+# create pages use, and written with one multi-row INSERT per batch, each
+# batch in its own transaction. Shows go through the double-booking checks
+# of scheduling.py first. Rows that can't be parsed, fail validation
+# or are refused by the database are written to an error report with their
+# line number instead of aborting the load. After
+# every committed batch the line number reached is saved to a checkpoint
+# file, so an interrupted import picks up where it stopped with --resume.
+#
+# The file can't be written in the batch's transaction, so before the
+# commit the line number goes to a pending checkpoint along with the
+# transaction id. If the import stops between the commit and the
+# checkpoint, --resume asks the database whether that transaction
+# committed, and doesn't insert the batch a second time.
+
+IMPORTS = {
+    'venues': (VenueForm, Venue),
+    'artists': (ArtistForm, Artist),
+    'shows': (ShowForm, Show),
+}
+
+# form field -> column, where they differ
+COLUMNS = {
+    'artist_id': 'artists_id',
+    'venue_id': 'venues_id',
+}
+
+BOOLEANS = ('seeking_talent', 'seeking_venue')
+
+
+def read_rows(path):
+    # (line number, row dict, errors) triples, without loading the whole
+    # file; lines that aren't a JSON object come with errors and no row
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            for number, row in enumerate(csv.DictReader(f), 2):
+                if row.get('genres'):
+                    row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+                yield number, row, None
+        else:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as error:
+                    yield number, None, {"line": ['Not valid JSON: %s' % error]}
+                    continue
+                if not isinstance(row, dict):
+                    yield number, None, {"line": ['Not a JSON object.']}
+                    continue
+                yield number, row, None
+
+
+def formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, item)
+        elif isinstance(value, bool) or value is None:
+            data.add(key, 'y' if value else '')
+        elif key in BOOLEANS and str(value).lower() in ('false', 'no', '0'):
+            data.add(key, '')
+        else:
+            data.add(key, str(value))
+    return data
+
+
+def validate(form_class, row):
+    # run the row through the create form, minus CSRF
+    form = form_class(formdata=formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    values = {}
+    for name, field in form._fields.items():
+        if name in ('submit', 'csrf_token'):
+            continue
+        values[COLUMNS.get(name, name)] = field.data
+    return values, None
+
+
+def write_batch(model, rows, report):
+    if model is Show:
+        # no double bookings, as through the form and the tours API
+        errors = check_batch([(values['venues_id'], values['artists_id'], values['start_time'])
+                              for number, values in rows])
+        for index, error in errors.items():
+            report_error(report, rows[index][0], {"show": [error]})
+        rows = [row for index, row in enumerate(rows) if index not in errors]
+    if rows:
+        rows = insert_rows(model, rows, report)
+    if rows and model is Show:
+        # the insert bypasses the ORM events that keep the counters
+        recount(Venue, [values['venues_id'] for number, values in rows])
+        recount(Artist, [values['artists_id'] for number, values in rows])
+    return len(rows)
+
+
+def insert_rows(model, rows, report):
+    # One INSERT for the batch, in a savepoint. If the database refuses it
+    # (a value too long for its column, a constraint), the rows are inserted
+    # one by one to find and report the bad ones. Returns the rows written.
+    try:
+        with db.session.begin_nested():
+            db.session.execute(model.__table__.insert(), [values for number, values in rows])
+        return rows
+    except (DataError, IntegrityError):
+        pass
+    written = []
+    for number, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(model.__table__.insert(), [values])
+        except (DataError, IntegrityError) as error:
+            report_error(report, number, {"database": [str(error.orig).strip()]})
+        else:
+            written.append((number, values))
+    return written
+
+
+def report_error(report, number, errors):
+    report.write(json.dumps({"line": number, "errors": errors}) + '\n')
+
+
+def load_checkpoint(path):
+    try:
+        with open(path + '.pending') as f:
+            pending = json.load(f)
+    except (IOError, ValueError):
+        pending = None
+    if pending is not None and db.session.execute(
+            db.text('SELECT txid_status(:txid)'), {'txid': pending['txid']}).scalar() == 'committed':
+        return pending['line']
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (IOError, ValueError):
+        return 0
+
+
+def save_checkpoint(path, number):
+    with open(path + '.tmp', 'w') as f:
+        f.write(str(number))
+    os.replace(path + '.tmp', path)
+
+
+def commit_batch(checkpoint, number):
+    # commit the batch, recording `number` as the last line it covers
+    txid = db.session.execute(db.text('SELECT txid_current()')).scalar()
+    with open(checkpoint + '.pending', 'w') as f:
+        json.dump({"line": number, "txid": txid}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    db.session.commit()
+    save_checkpoint(checkpoint, number)
+    os.remove(checkpoint + '.pending')
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per INSERT and transaction.')
+@click.option('--errors', 'errors_path', default=None, help='Error report (JSONL). Defaults to PATH.errors.jsonl.')
+@click.option('--resume/--no-resume', default=False, help='Skip rows committed by a previous run.')
+@with_appcontext
+def import_command(kind, path, batch_size, errors_path, resume):
+    """Import venues, artists or shows from a CSV or JSONL file."""
+    form_class, model = IMPORTS[kind]
+    checkpoint = path + '.checkpoint'
+    errors_path = errors_path or path + '.errors.jsonl'
+    start = load_checkpoint(checkpoint) if resume else 0
+    imported = rejected = 0
+    batch = []
+    # the forms need a request context, one is enough for the whole file
+    with open(errors_path, 'a' if resume else 'w') as report, current_app.test_request_context():
+        for number, row, errors in read_rows(path):
+            if number <= start:
+                continue
+            if errors:
+                report_error(report, number, errors)
+                rejected += 1
+                continue
+            # ShowForm's IntegerFields parse the ids; check_batch reports
+            # the ones naming no row
+            values, errors = validate(form_class, row)
+            if errors:
+                report_error(report, number, errors)
+                rejected += 1
+            else:
+                batch.append((number, values))
+            if len(batch) >= batch_size:
+                written = write_batch(model, batch, report)
+                imported += written
+                rejected += len(batch) - written
+                batch = []
+                commit_batch(checkpoint, number)
+        if batch:
+            written = write_batch(model, batch, report)
+            imported += written
+            rejected += len(batch) - written
+            commit_batch(checkpoint, number)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    click.echo('%d %s imported, %d rejected (see %s)' % (imported, kind, rejected, errors_path))
@@ -0,0 +1,221 @@
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from types import GeneratorType
+from flask import request, session
+from models import db, Show
+from metrics import registry
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+
+class LRUCache(object):
+    # In-process cache bounded to `max_entries`, and to `max_size` in total
+    # length of the values when given; least recently used entries are
+    # dropped first. Every entry carries its own expiry time.
+
+    def __init__(self, max_entries=1024, default_timeout=300, max_size=None):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _sizeof(self, value):
+        return len(value) if self.max_size is not None else 0
+
+    def _drop(self, key):
+        expires, value = self._entries.pop(key)
+        self.size -= self._sizeof(value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self.size += self._sizeof(value)
+            while len(self._entries) > self.max_entries or (
+                    self.max_size is not None and self.size > self.max_size):
+                self._drop(next(iter(self._entries)))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._drop(key)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class NullCache(object):
+    # Caches nothing; used to switch response caching off.
+
+    def __init__(self, **options):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+
+BACKENDS = {
+    'lru': LRUCache,
+    'null': NullCache,
+}
+
+#----------------------------------------------------------------------------#
+# Response cache.
+#----------------------------------------------------------------------------#
+
+
+class Cache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.variants = []
+        self.max_page_size = 512 * 1024
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = BACKENDS[app.config.get('CACHE_TYPE', 'lru')]
+        self.backend = backend(
+            max_entries=app.config.get('CACHE_MAX_ENTRIES', 1024),
+            default_timeout=app.config.get('CACHE_DEFAULT_TIMEOUT', 300),
+            max_size=app.config.get('CACHE_MAX_SIZE', 32 * 1024 * 1024))
+        self.max_page_size = app.config.get('CACHE_MAX_PAGE_SIZE', 512 * 1024)
+        app.extensions['cache'] = self
+
+    def vary(self, variant):
+        # Register a callable whose result the rendered pages depend on
+        # (e.g. the request locale). Each result gets its own cache entry.
+        self.variants.append(variant)
+        return variant
+
+    def cached(self, key, timeout=None, query_string=False):
+        # Cache the rendered page of a view under `key`, formatted with the
+        # view arguments. Pages carrying flashed messages are neither served
+        # from nor stored in the cache, so the message is shown exactly once.
+        # Streamed pages (generators) are stored once fully sent. Pages over
+        # CACHE_MAX_PAGE_SIZE characters are not stored.
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                cache_key = key.format(**kwargs) + '|' + '|'.join(
+                    variant() for variant in self.variants)
+                if query_string:
+                    cache_key += '?' + request.query_string.decode()
+                if session.get('_flashes'):
+                    return view(**kwargs)
+                page = self.backend.get(cache_key)
+                if page is not None:
+                    registry.inc('fyyur_cache_requests_total', result='hit')
+                    return page
+                registry.inc('fyyur_cache_requests_total', result='miss')
+                page = view(**kwargs)
+                if session.get('_flashes'):
+                    return page
+                if isinstance(page, str):
+                    if len(page) <= self.max_page_size:
+                        self.backend.set(cache_key, page, timeout)
+                elif isinstance(page, GeneratorType) and not isinstance(self.backend, NullCache):
+                    return self.store(cache_key, page, timeout)
+                return page
+            return wrapper
+        return decorator
+
+    def store(self, key, chunks, timeout):
+        # pass a streamed page through, keeping a copy to cache when it is
+        # complete, unless it grows past CACHE_MAX_PAGE_SIZE characters
+        kept = []
+        size = 0
+        try:
+            for chunk in chunks:
+                if kept is not None:
+                    kept.append(chunk)
+                    size += len(chunk)
+                    if size > self.max_page_size:
+                        kept = None
+                yield chunk
+        finally:
+            chunks.close()
+        if kept is not None:
+            self.backend.set(key, ''.join(kept), timeout)
+
+    def delete(self, *keys):
+        # every variant of every page cached under these keys
+        for key in keys:
+            self.backend.delete_prefix(key + '|')
+
+    def clear(self):
+        self.backend.clear()
+
+    #  Invalidation
+    #  ----------------------------------------------------------------
+
+    def venue_changed(self, venue_id=None):
+        # a new venue only shows up in the areas listing; an edited one also
+        # appears on its own page, in the /shows feed and on the pages of
+        # every artist who played there
+        self.delete('venues')
+        if venue_id is None:
+            return
+        artist_ids = db.session.query(Show.artists_id).filter(
+            Show.venues_id == venue_id).distinct()
+        self.delete('venue:%d' % venue_id, 'shows',
+                    *['artist:%d' % row.artists_id for row in artist_ids])
+
+    def artist_changed(self, artist_id=None):
+        self.delete('artists')
+        if artist_id is None:
+            return
+        venue_ids = db.session.query(Show.venues_id).filter(
+            Show.artists_id == artist_id).distinct()
+        self.delete('artist:%d' % artist_id, 'shows',
+                    *['venue:%d' % row.venues_id for row in venue_ids])
+
+    def show_changed(self, venue_id, artist_id):
+        self.shows_changed([venue_id], [artist_id])
+
+    def shows_changed(self, venue_ids, artist_ids):
+        # the listings show upcoming show counts too
+        self.delete('venues', 'artists', 'shows',
+                    *['venue:%d' % venue_id for venue_id in set(venue_ids)] +
+                    ['artist:%d' % artist_id for artist_id in set(artist_ids)])
@@ -0,0 +1,50 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import current_app, g, request, make_response
+
+# Conditional GET support. A validator returns (last_modified, parts) for
+# the page about to be rendered, or None when there is nothing to validate
+# against. The ETag is a digest of both, so a request whose If-None-Match or
+# If-Modified-Since still matches gets a 304 without running the view.
+
+
+def conditional(validator):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            validated = validator(**kwargs)
+            if validated is None:
+                return view(**kwargs)
+            last_modified, parts = validated
+            # pages are rendered in the language negotiated from the
+            # client's Accept-Language, not in the header itself: hash that,
+            # so the etag (and the page cache key) has one value per
+            # language served. The etag keeps the full precision, two edits
+            # can land in the same second
+            language = current_app.extensions['datetime_formatter'].locale()
+            etag = hashlib.md5(repr(
+                (last_modified, parts, language)).encode()).hexdigest()
+            # stored times are naive local time; HTTP dates are UTC seconds
+            last_modified = last_modified.astimezone(
+                timezone.utc).replace(microsecond=0)
+            # for the page cache: a page cached under an older etag, e.g.
+            # by a worker that missed an invalidation, is never served
+            g.etag = etag
+            if request.if_none_match:
+                # weak comparison: compressed responses carry a weak tag
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified <= since
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(**kwargs))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            response.vary.add('Accept-Language')
+            return response
+        return wrapper
+    return decorator
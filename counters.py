@@ -0,0 +1,135 @@
+from collections import Counter
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from models import db, Artist, Venue, Show
+
+# Denormalized upcoming/past show counters on venues and artists.
+#
+# Every show is counted once on its venue and once on its artist, as
+# upcoming or as past according to shows.counted_past. The mapper events
+# below adjust the counters in the same transaction whenever a show is
+# inserted, updated or deleted through the ORM; bulk writes call recount().
+# Shows don't stay upcoming forever, so `flask counters sweep` (run it from
+# cron every few minutes) moves started shows over to the past counters.
+
+SIDES = (
+    (Venue, 'venues_id'),
+    (Artist, 'artists_id'),
+)
+
+
+def adjust(connection, model, entity_id, past, delta):
+    column = model.past_shows_count if past else model.upcoming_shows_count
+    connection.execute(
+        model.__table__.update().where(model.id == entity_id).values(
+            {column.key: column + delta}))
+
+
+def previous(show, attribute):
+    history = get_history(show, attribute)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(show, attribute)
+
+
+def started(show):
+    return show.start_time is not None and show.start_time < datetime.now()
+
+
+# Moving a show takes its count off the old venue or artist. Load the old
+# id when the attribute is set, or a show expired by a commit would have no
+# history and its old venue would keep the count.
+for attribute in (Show.venues_id, Show.artists_id):
+    event.listen(attribute, 'set', lambda show, value, old, initiator: None,
+                 active_history=True)
+
+
+@event.listens_for(Show, 'before_insert')
+def show_inserted(mapper, connection, show):
+    show.counted_past = started(show)
+    for model, column in SIDES:
+        adjust(connection, model, getattr(show, column), show.counted_past, 1)
+
+
+@event.listens_for(Show, 'before_update')
+def show_updated(mapper, connection, show):
+    was_past = previous(show, 'counted_past')
+    show.counted_past = started(show)
+    for model, column in SIDES:
+        adjust(connection, model, previous(show, column), was_past, -1)
+        adjust(connection, model, getattr(show, column), show.counted_past, 1)
+
+
+@event.listens_for(Show, 'before_delete')
+def show_deleted(mapper, connection, show):
+    for model, column in SIDES:
+        adjust(connection, model, getattr(show, column), show.counted_past, -1)
+
+
+def recount(model, ids=None):
+    # Recompute the counters of the given venues or artists (all of them
+    # when ids is None) from the shows table, after writes that bypass the
+    # ORM events such as bulk inserts.
+    column = dict(SIDES)[model]
+    shows = db.session.query(db.func.count(Show.id)).filter(
+        getattr(Show, column) == model.id)
+    update = model.__table__.update().values(
+        upcoming_shows_count=shows.filter(
+            Show.counted_past.is_(False)).scalar_subquery(),
+        past_shows_count=shows.filter(
+            Show.counted_past.is_(True)).scalar_subquery(),
+    )
+    if ids is not None:
+        update = update.where(model.id.in_(set(ids)))
+    db.session.execute(update)
+
+
+def sweep(now=None):
+    # Move every show that has started since the last sweep from the
+    # upcoming to the past counters, in one transaction. The partial index
+    # on uncounted shows keeps this cheap however many past shows exist.
+    if now is None:
+        now = datetime.now()
+    moved = db.session.execute(Show.__table__.update().where(
+        Show.counted_past.is_(False)
+    ).where(
+        Show.start_time < now
+    ).values(
+        counted_past=True
+    ).returning(Show.venues_id, Show.artists_id)).fetchall()
+    for index, (model, column) in enumerate(SIDES):
+        counts = Counter(row[index] for row in moved)
+        if counts:
+            db.session.execute(model.__table__.update().where(
+                model.id == db.bindparam('entity_id')
+            ).values(
+                upcoming_shows_count=model.upcoming_shows_count - db.bindparam('moved'),
+                past_shows_count=model.past_shows_count + db.bindparam('moved'),
+            ), [{'entity_id': entity_id, 'moved': count}
+                # in id order, venues then artists, like every other writer
+                # (scheduling.lock_entities), so two can't deadlock
+                for entity_id, count in sorted(counts.items())])
+    db.session.commit()
+    return len(moved)
+
+
+counters = AppGroup('counters', help='Maintain the upcoming/past show counters.')
+
+
+@counters.command('sweep')
+def sweep_command():
+    """Move shows that have started to the past counters."""
+    click.echo('%d shows moved to past' % sweep())
+
+
+@counters.command('rebuild')
+def rebuild_command():
+    """Recompute every counter from the shows table."""
+    sweep()
+    recount(Venue)
+    recount(Artist)
+    db.session.commit()
+    click.echo('counters rebuilt')
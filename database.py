@@ -0,0 +1,110 @@
+import time
+from threading import Lock
+from functools import wraps
+from flask import g, session, has_app_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import exc, orm
+from sqlalchemy.pool import QueuePool
+
+# Connection pooling and read-replica routing.
+#
+# Pool sizing comes from SQLALCHEMY_ENGINE_OPTIONS (see config.py). Every
+# engine uses InstrumentedQueuePool, which counts checkouts, time spent
+# waiting for a connection and checkout timeouts, for /healthz. When a
+# 'replica' bind is configured, views wrapped in @read_only run their
+# queries against it; everything else, and every write, uses the primary.
+
+
+class InstrumentedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = {"checkouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "timeouts": 0}
+        # the worker's threads check out concurrently
+        self.stats_lock = Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self.stats_lock:
+                self.stats["checkouts"] += 1
+                self.stats["wait_seconds"] += waited
+                self.stats["timeouts"] += timed_out
+                if waited > self.stats["max_wait_seconds"]:
+                    self.stats["max_wait_seconds"] = waited
+
+    def recreate(self):
+        # pre-ping and invalidation rebuild the pool, keep the counters
+        pool = super().recreate()
+        pool.stats = self.stats
+        pool.stats_lock = self.stats_lock
+        return pool
+
+    def snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+
+def has_replica(app):
+    return 'replica' in (app.config['SQLALCHEMY_BINDS'] or {})
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if has_app_context() and g.get('read_replica') and has_replica(self.app):
+            return get_state(self.app).db.get_engine(self.app, bind='replica')
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def __init__(self, app=None, **kwargs):
+        kwargs.setdefault('engine_options', {'poolclass': InstrumentedQueuePool})
+        super().__init__(app, **kwargs)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def read_only(f):
+    # Send the view's queries to the replica, if there is one. Every write
+    # redirects with a flash message, so a pending flash means the client
+    # just wrote something: read it back from the primary.
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_replica = '_flashes' not in session
+        return f(*args, **kwargs)
+    return decorated
+
+
+def pool_status(db, app):
+    engines = {'primary': db.get_engine(app)}
+    if has_replica(app):
+        engines['replica'] = db.get_engine(app, bind='replica')
+    status = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        stats = pool.snapshot() if isinstance(pool, InstrumentedQueuePool) else {}
+        if stats.get('checkouts'):
+            stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['checkouts']
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_in=pool.checkedin(),
+                         checked_out=pool.checkedout(), overflow=pool.overflow())
+        status[name] = stats
+    return status
+
+
+def dispose_engines(db, app):
+    # Drop pooled connections inherited from a parent process; each forked
+    # worker must open its own.
+    binds = [None] + (['replica'] if has_replica(app) else [])
+    for bind in binds:
+        db.get_engine(app, bind=bind).dispose()
@@ -0,0 +1,104 @@
+import csv
+import io
+from datetime import datetime
+import click
+from flask import Blueprint, Response, request, stream_with_context, abort, g
+from flask.cli import with_appcontext
+from models import db, Artist, Venue, Show
+from api import dumps
+
+# Streaming export of the catalog as JSONL or CSV, for the command line and
+# over HTTP. Rows come off a server-side cursor in chunks of YIELD_PER and
+# are serialized one at a time, so memory stays flat whatever the table
+# size. With `since`, only rows whose updated_at is later are exported, in
+# updated_at order, so the last row's updated_at is the next `since`.
+
+EXPORTS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show,
+}
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+YIELD_PER = 1000
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+
+@export.before_request
+def use_replica():
+    g.read_replica = True
+
+
+def export_rows(kind, since=None):
+    model = EXPORTS[kind]
+    query = db.session.query(*model.__table__.columns)
+    if since is not None:
+        query = query.filter(model.updated_at > since)
+    query = query.order_by(model.updated_at, model.id)
+    for row in query.execution_options(stream_results=True).yield_per(YIELD_PER):
+        yield row._asdict()
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def serialize(kind, rows, format):
+    if format == 'jsonl':
+        for row in rows:
+            line = dumps(row)
+            yield (line if isinstance(line, str) else line.decode()) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in EXPORTS[kind].__table__.columns])
+    for row in rows:
+        writer.writerow([csv_value(value) for value in row.values()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def parse_since(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+@export.route('/<kind>.<format>')
+def download(kind, format):
+    if kind not in EXPORTS or format not in FORMATS:
+        abort(404)
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        abort(400)
+    body = serialize(kind, export_rows(kind, since), format)
+    return Response(stream_with_context(body), mimetype=FORMATS[format], headers={
+        'Content-Disposition': 'attachment; filename=%s.%s' % (kind, format),
+    })
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'format', type=click.Choice(sorted(FORMATS)), default='jsonl', show_default=True)
+@click.option('--since', default=None, help='Only rows changed after this ISO timestamp.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_command(kind, format, since, output):
+    """Export venues, artists or shows as JSONL or CSV."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter('not an ISO timestamp', param_hint='--since')
+    for chunk in serialize(kind, export_rows(kind, since), format):
+        output.write(chunk)
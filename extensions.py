@@ -0,0 +1,29 @@
+from flask import g
+from flask_moment import Moment
+from cache import Cache
+from formatting import DatetimeFormatter
+from instrumentation import Instrumentation
+from metrics import Metrics
+from typeahead import Typeahead
+from streaming import Compress
+from assets import Assets
+from fragments import FragmentCache
+
+# Extensions, created unbound so the blueprints can use them (@cache.cached)
+# at import time. create_app (app.py) binds them to the app.
+
+moment = Moment()
+formatter = DatetimeFormatter()
+cache = Cache()
+# pages are rendered in the client's language, and a page cached under an
+# older etag (by a worker that missed an invalidation) is never served
+cache.vary(formatter.locale)
+cache.vary(lambda: g.get('etag', ''))
+instrumentation = Instrumentation()
+metrics = Metrics()
+typeahead = Typeahead()
+compress = Compress()
+assets = Assets()
+fragments = FragmentCache()
+# tiles show dates in the client's language
+fragments.vary(formatter.locale)
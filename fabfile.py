@@ -6,8 +6,10 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
+        # every route once through the benchmark runner, which fails on
+        # any error response
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m benchmarks.run --iterations 5 --warmup 1 -o benchmark-smoke.json", capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -40,7 +42,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m benchmarks.run --iterations 5 --warmup 1 -o /tmp/benchmark.json"
     )
 
 
@@ -0,0 +1,71 @@
+from datetime import datetime
+from functools import lru_cache
+from flask import g, request, has_request_context
+
+# The `datetime` template filter. Patterns are compiled once, locales are
+# parsed once, and rendered strings are memoized in a bounded LRU keyed by
+# (value, format, locale), since the same show times are rendered on every
+# /shows page. The locale is negotiated from the request's Accept-Language
+# against the LANGUAGES setting.
+#
+# babel and dateutil are only imported when the first date is rendered, so
+# CLI commands and workers that never render one don't pay for them;
+# preload() does it up front (wsgi.py, before gunicorn forks the workers).
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(format):
+    from babel.dates import parse_pattern
+    return parse_pattern(PATTERNS.get(format, format))
+
+
+@lru_cache(maxsize=None)
+def get_locale(identifier):
+    from babel import Locale
+    return Locale.parse(identifier)
+
+
+def render(value, format, locale):
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return compile_pattern(format).apply(value, get_locale(locale))
+
+
+class DatetimeFormatter(object):
+
+    def __init__(self, app=None):
+        self.languages = ['en']
+        self.render = render
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.languages = app.config.get('LANGUAGES', ['en'])
+        self.render = lru_cache(
+            maxsize=app.config.get('DATETIME_CACHE_SIZE', 4096))(render)
+        app.jinja_env.filters['datetime'] = self.format_datetime
+        app.extensions['datetime_formatter'] = self
+
+    def preload(self):
+        for format in PATTERNS:
+            compile_pattern(format)
+        for language in self.languages:
+            get_locale(language)
+
+    def locale(self):
+        # negotiated once per request
+        if not has_request_context():
+            return self.languages[0]
+        if 'locale' not in g:
+            g.locale = request.accept_languages.best_match(
+                self.languages, default=self.languages[0])
+        return g.locale
+
+    def format_datetime(self, value, format='medium', locale=None):
+        return self.render(value, format, locale or self.locale())
@@ -1,14 +1,23 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, SubmitField
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, SubmitField, IntegerField
 from wtforms.validators import DataRequired, AnyOf, URL
+from metrics import registry
 
-class ShowForm(FlaskForm):
-    artist_id = StringField(
-        'artist_id'
+class MeteredForm(FlaskForm):
+    # counts failed validations per form, for /metrics
+    def validate(self, extra_validators=None):
+        valid = super().validate(extra_validators)
+        if not valid:
+            registry.inc('fyyur_form_validation_failures_total', form=type(self).__name__)
+        return valid
+
+class ShowForm(MeteredForm):
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired()]
     )
     start_time = DateTimeField(
         'start_time',
@@ -17,7 +26,7 @@ class ShowForm(FlaskForm):
     )
     submit = SubmitField('Create Show')
 
-class VenueForm(FlaskForm):
+class VenueForm(MeteredForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -131,7 +140,7 @@ class VenueForm(FlaskForm):
 
 
 
-class ArtistForm(FlaskForm):
+class ArtistForm(MeteredForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -0,0 +1,76 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from cache import LRUCache, NullCache
+
+# Template fragment cache. In a template,
+#
+#     {% cache 'venue', venue.id, venue.updated_at %}...{% endcache %}
+#
+# renders the body once and reuses the markup wherever the same key comes
+# up again, on any page: the venue and artist tiles of the listings and
+# search results, and the show tiles of /shows and of the venue and artist
+# pages. Keys name everything the body shows, the ids and updated_at of the
+# rows it comes from, so an edit makes a new key rather than needing an
+# invalidation; old entries age out of the LRU. The entries are bounded in
+# number and in total size (FRAGMENT_CACHE_MAX_SIZE characters), per
+# worker process.
+
+
+class CacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.Tuple(args, 'load')]),
+            [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        fragments = self.environment.fragment_cache
+        if fragments is None:
+            return caller()
+        return fragments.render(key, caller)
+
+
+class FragmentCache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.variants = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if app.config.get('FRAGMENT_CACHE', True):
+            self.backend = LRUCache(
+                max_entries=app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 50000),
+                default_timeout=app.config.get('FRAGMENT_CACHE_TIMEOUT', 24 * 3600),
+                max_size=app.config.get('FRAGMENT_CACHE_MAX_SIZE', 4 * 1024 * 1024))
+        app.jinja_env.add_extension(CacheExtension)
+        app.jinja_env.fragment_cache = self
+        app.extensions['fragment_cache'] = self
+
+    def vary(self, variant):
+        # like Cache.vary: fragments depending on e.g. the locale are kept
+        # once per result
+        self.variants.append(variant)
+        return variant
+
+    def render(self, key, caller):
+        key += tuple(variant() for variant in self.variants)
+        markup = self.backend.get(key)
+        if markup is None:
+            markup = caller()
+            self.backend.set(key, markup)
+        return markup
+
+    def clear(self):
+        self.backend.clear()
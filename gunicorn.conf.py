@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# gunicorn settings, overridable from the environment:
+#
+#     WEB_CONCURRENCY   worker processes (default 2 x CPUs + 1)
+#     GUNICORN_THREADS  threads per worker (default 4)
+#     PORT              port to listen on (default 8000)
+#     GUNICORN_TIMEOUT  seconds before a stuck worker is restarted (default 30)
+#
+# The app is imported once in the master and forked into the workers
+# (preload), so workers start fast and share memory. Reloading: `kill -HUP`
+# the master to replace workers gracefully with the same code; to deploy
+# new code without dropping requests, `kill -USR2` the master (starts a new
+# master with the new code), then `kill -QUIT` the old one.
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+# recycle workers now and then, staggered, to bound memory growth
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # connections opened in the master during import must not be shared
+    from models import db
+    from database import dispose_engines
+    dispose_engines(db, worker.app.wsgi())
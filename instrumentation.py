@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from flask import g, request, has_request_context, signals
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request instrumentation: the number of SQL statements, the time spent
+# in the database and in templates, and the total, for every request. The
+# numbers go out as a Server-Timing header (visible in the browser's network
+# tab) and as one JSON log line per request, tagged with the endpoint.
+# Requests running more than QUERY_COUNT_THRESHOLD statements are logged as
+# warnings, which is how N+1 query loops show up.
+#
+# Nothing is registered unless INSTRUMENTATION is on, so when it is off the
+# cost is nil. Template timing needs blinker (Flask's signals).
+
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line, with whatever was passed as extra={'data': ...}
+
+    def format(self, record):
+        line = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+        }
+        if hasattr(record, 'data'):
+            line.update(record.data)
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class RequestStats(object):
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.renders = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - context.query_started
+
+
+def before_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats.renders.append(time.perf_counter())
+
+
+def after_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats.renders:
+        stats.template_time += time.perf_counter() - stats.renders.pop()
+
+
+class Instrumentation(object):
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.threshold = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION', False)
+        self.threshold = app.config.get('QUERY_COUNT_THRESHOLD')
+        self.logger = app.logger
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+        if not event.contains(Engine, 'after_cursor_execute', after_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        if signals.signals_available:
+            signals.before_render_template.connect(before_render, app)
+            signals.template_rendered.connect(after_render, app)
+        app.before_request(self.start)
+        app.after_request(self.finish)
+
+    def start(self):
+        g.request_stats = RequestStats()
+
+    def finish(self, response):
+        stats = g.get('request_stats')
+        if stats is None:
+            return response
+        response.headers.add('Server-Timing', ', '.join([
+            'db;dur=%.1f;desc="%d queries"' % (stats.db_time * 1000, stats.queries),
+            'tpl;dur=%.1f' % (stats.template_time * 1000),
+            'total;dur=%.1f' % (stats.elapsed() * 1000),
+        ]))
+        data = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+        }
+        if response.is_streamed:
+            # a streamed page runs its queries and templates after this
+            # point: the header only covers the time to the first byte, the
+            # log line waits until the whole body has been sent
+            response.call_on_close(lambda: self.log(stats, data))
+        else:
+            self.log(stats, data)
+        return response
+
+    def log(self, stats, data):
+        total = stats.elapsed()
+        too_many = self.threshold is not None and stats.queries > self.threshold
+        data.update({
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 2),
+            "template_ms": round(stats.template_time * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "too_many_queries": too_many,
+        })
+        self.logger.log(logging.WARNING if too_many else logging.INFO,
+                        '%(method)s %(path)s %(status)d, %(queries)d queries, %(total_ms).1fms',
+                        data, extra={'data': data})
@@ -0,0 +1,209 @@
+import time
+import weakref
+from bisect import bisect_left
+from threading import Lock, local
+from flask import Response, current_app, g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import pool_status
+
+# Prometheus metrics at /metrics, in the text exposition format.
+#
+# Every thread records into its own shard, a plain dict only that thread
+# writes to, so recording never takes a lock; the lock is only held when a
+# thread records its first sample, or when it exits: the shard of a dead
+# thread is then folded into a base total. A scrape adds up the base and
+# the shards. Gauges (connection pools) are read when scraped.
+
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.metrics = {}
+        self._shards = []
+        self._base = {}
+        self._lock = Lock()
+        self._local = local()
+
+    def counter(self, name, help):
+        self.metrics[name] = ('counter', help, None)
+
+    def histogram(self, name, help, buckets=BUCKETS):
+        self.metrics[name] = ('histogram', help, buckets)
+
+    def _shard(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            # the thread-local holder goes away with its thread
+            holder = self._local.holder = Holder()
+            with self._lock:
+                self._shards.append(holder.shard)
+            weakref.finalize(holder, self._retire, holder.shard)
+        return holder.shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            merge(self._base, shard)
+
+    def inc(self, name, amount=1, **labels):
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        series = shard.get(key)
+        if series is None:
+            # a count per bucket, the +Inf bucket, then the sum
+            series = shard[key] = [0] * (len(self.metrics[name][2]) + 1) + [0.0]
+        series[bisect_left(self.metrics[name][2], value)] += 1
+        series[-1] += value
+
+    def collect(self):
+        totals = {}
+        with self._lock:
+            merge(totals, self._base)
+            shards = list(self._shards)
+        for shard in shards:
+            merge(totals, shard)
+        return totals
+
+    def render(self, gauges=()):
+        # gauges: (name, help, [(labels, value), ...]) read at scrape time
+        totals = self.collect()
+        lines = []
+        for name, (kind, help, buckets) in sorted(self.metrics.items()):
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for (series, labels), value in sorted(totals.items()):
+                if series != name:
+                    continue
+                if kind == 'counter':
+                    lines.append('%s%s %s' % (name, format_labels(labels), value))
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value):
+                    cumulative += count
+                    lines.append('%s_bucket%s %d' % (
+                        name, format_labels(labels + (('le', str(bound)),)), cumulative))
+                lines.append('%s_sum%s %s' % (name, format_labels(labels), value[-1]))
+                lines.append('%s_count%s %d' % (name, format_labels(labels), cumulative))
+        for name, help, samples in gauges:
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s gauge' % name)
+            for labels, value in samples:
+                lines.append('%s%s %s' % (name, format_labels(tuple(sorted(labels.items()))), value))
+        return '\n'.join(lines) + '\n'
+
+
+class Holder(object):
+    # weakly referenceable, unlike the dict it carries
+
+    def __init__(self):
+        self.shard = {}
+
+
+def merge(totals, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            total = totals.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                total[index] += item
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for key, value in labels)
+
+
+registry = Registry()
+registry.counter('fyyur_requests_total', 'HTTP requests by endpoint, method and status.')
+registry.histogram('fyyur_request_duration_seconds', 'HTTP request latency by endpoint and method.')
+registry.counter('fyyur_db_queries_total', 'SQL statements run, by endpoint.')
+registry.histogram('fyyur_db_query_duration_seconds', 'SQL statement latency, by endpoint.')
+registry.counter('fyyur_cache_requests_total', 'Page cache lookups, by result (hit or miss).')
+registry.counter('fyyur_form_validation_failures_total', 'Forms that failed validation, by form.')
+
+
+def endpoint():
+    if not has_request_context():
+        return 'none'
+    return request.endpoint or 'unmatched'
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    label = endpoint()
+    registry.inc('fyyur_db_queries_total', endpoint=label)
+    registry.observe('fyyur_db_query_duration_seconds',
+                     time.perf_counter() - context.metrics_started, endpoint=label)
+
+
+class Metrics(object):
+
+    def __init__(self, app=None, db=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        self.db = db or self.db
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS', False):
+            return
+        if not event.contains(Engine, 'after_cursor_execute', after_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        app.add_url_rule('/metrics', 'metrics', self.expose)
+
+    def start(self):
+        g.metrics_started = time.perf_counter()
+
+    def finish(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        labels = {"endpoint": endpoint(), "method": request.method}
+        registry.inc('fyyur_requests_total', status=response.status_code, **labels)
+        if response.is_streamed:
+            # streamed pages are timed until their last byte is sent
+            response.call_on_close(lambda: registry.observe(
+                'fyyur_request_duration_seconds', time.perf_counter() - started, **labels))
+        else:
+            registry.observe('fyyur_request_duration_seconds',
+                             time.perf_counter() - started, **labels)
+        return response
+
+    def expose(self):
+        return Response(registry.render(self.pool_gauges()),
+                        mimetype='text/plain; version=0.0.4')
+
+    def pool_gauges(self):
+        if self.db is None:
+            return []
+        pools = pool_status(self.db, current_app)
+        gauges = []
+        for name, help, key in (
+                ('fyyur_db_pool_size', 'Connections the pool keeps open.', 'size'),
+                ('fyyur_db_pool_checked_out', 'Connections in use.', 'checked_out'),
+                ('fyyur_db_pool_checked_in', 'Idle connections in the pool.', 'checked_in'),
+                ('fyyur_db_pool_overflow', 'Connections open beyond the pool size.', 'overflow'),
+                ('fyyur_db_pool_checkouts', 'Connection checkouts since start.', 'checkouts'),
+                ('fyyur_db_pool_wait_seconds', 'Time spent waiting for a connection since start.', 'wait_seconds'),
+                ('fyyur_db_pool_timeouts', 'Checkouts that timed out since start.', 'timeouts')):
+            gauges.append((name, help, [({'pool': pool}, stats[key])
+                                        for pool, stats in pools.items() if key in stats]))
+        return gauges
@@ -0,0 +1,29 @@
+"""add artist name indexes
+
+Revision ID: 7527f6a70671
+Revises: ee43c0e17e23
+Create Date: 2026-10-18 06:43:14.752729
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7527f6a70671'
+down_revision = 'ee43c0e17e23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # expression indexes, autogenerate can't see these
+    op.create_index('ix_artists_lower_name_id', 'artists',
+                    [sa.text('lower(name)'), 'id'], unique=False)
+    op.create_index('ix_artists_state_lower_name_id', 'artists',
+                    ['state', sa.text('lower(name)'), 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artists_state_lower_name_id', table_name='artists')
+    op.drop_index('ix_artists_lower_name_id', table_name='artists')
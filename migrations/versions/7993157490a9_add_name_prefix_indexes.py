@@ -0,0 +1,29 @@
+"""add name prefix indexes
+
+Revision ID: 7993157490a9
+Revises: 7527f6a70671
+Create Date: 2026-10-18 06:47:23.246564
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7993157490a9'
+down_revision = '7527f6a70671'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # expression indexes, autogenerate can't see these
+    op.create_index('ix_venues_lower_name_pattern', 'venues',
+                    [sa.text('lower(name) text_pattern_ops')], unique=False)
+    op.create_index('ix_artists_lower_name_pattern', 'artists',
+                    [sa.text('lower(name) text_pattern_ops')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artists_lower_name_pattern', table_name='artists')
+    op.drop_index('ix_venues_lower_name_pattern', table_name='venues')
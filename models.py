@@ -1,15 +1,26 @@
-from flask_sqlalchemy import SQLAlchemy
-from flask import Flask
-from sqlalchemy import ARRAY, String
+from datetime import datetime
+from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import ARRAY
+from database import RoutingSQLAlchemy
 
+# bound to the app by create_app (app.py)
+db = RoutingSQLAlchemy()
 
-app = Flask(__name__)
-app.config.from_object('config')
-db = SQLAlchemy(app)
+
+def has_started(context):
+    start_time = context.get_current_parameters().get('start_time')
+    return start_time is not None and start_time < datetime.now()
 
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        # trigram index so name ILIKE '%term%' searches don't scan the table
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_venues_state_city', 'state', 'city'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String())
     city = db.Column(db.String(120))
@@ -23,12 +34,26 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String())
     venues = db.relationship('Show', backref='venues', lazy=True)
+    # maintained by counters.py when shows are written and as time passes
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 
 class Artist(db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_artists_state_city', 'state', 'city'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String())
     city = db.Column(db.String(120))
@@ -41,14 +66,54 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean(), default=False)
     seeking_description = db.Column(db.String(300))
     artist = db.relationship('Show', backref='artists', lazy=True)
+    # maintained by counters.py when shows are written and as time passes
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+
+
+# the artist index pages through artists by (lower(name), id), on its own or
+# within a state
+db.Index('ix_artists_lower_name_id', db.func.lower(Artist.name), Artist.id)
+db.Index('ix_artists_state_lower_name_id', Artist.state,
+         db.func.lower(Artist.name), Artist.id)
+
+
+# typeahead: lower(name) LIKE 'prefix%' whatever the database collation
+db.Index('ix_venues_lower_name_pattern',
+         db.func.lower(Venue.name).label('lower_name'),
+         postgresql_ops={'lower_name': 'text_pattern_ops'})
+db.Index('ix_artists_lower_name_pattern',
+         db.func.lower(Artist.name).label('lower_name'),
+         postgresql_ops={'lower_name': 'text_pattern_ops'})
 
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        # keyset pagination of the /shows feed walks this index
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+        # per venue / per artist timelines and upcoming show counts
+        db.Index('ix_shows_venues_id_start_time', 'venues_id', 'start_time'),
+        db.Index('ix_shows_artists_id_start_time', 'artists_id', 'start_time'),
+        # shows still counted as upcoming, for the counters sweep
+        db.Index('ix_shows_uncounted_start_time', 'start_time',
+                 postgresql_where=db.text('NOT counted_past')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime)
     artists_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id'), nullable=False)
     venues_id = db.Column(db.Integer, db.ForeignKey(
         'venues.id'), nullable=False)
+    # whether the venue and artist counters count this show as past
+    counted_past = db.Column(db.Boolean, nullable=False, default=has_started,
+                             server_default=db.false())
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
@@ -0,0 +1,418 @@
+from itertools import groupby
+from operator import itemgetter
+from datetime import datetime
+from models import db, Artist, Venue, Show
+
+# rows fetched per round trip from the server-side cursors of the listings
+YIELD_PER = 500
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+
+def venue_areas():
+    # One ordered query for every venue, grouped into areas in Python
+    # instead of one query per city. Areas and their venues are generators
+    # reading a server-side cursor, so a streamed page holds YIELD_PER rows
+    # at a time however many venues there are; iterate each area's venues
+    # before moving to the next area.
+    rows = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_shows_count,
+        Venue.updated_at,
+    ).order_by(
+        Venue.state, Venue.city, Venue.id
+    ).execution_options(stream_results=True).yield_per(YIELD_PER)
+    for (city, state), venues in groupby(rows, key=itemgetter(2, 3)):
+        yield {
+            "city": city,
+            "state": state,
+            "venues": ({
+                "id": venue.id,
+                "name": venue.name,
+                "num_upcoming_shows": venue.upcoming_shows_count,
+                "updated_at": venue.updated_at,
+            } for venue in venues),
+        }
+
+
+#----------------------------------------------------------------------------#
+# Show timelines.
+#----------------------------------------------------------------------------#
+
+# For each side of a show: the column to filter on, the other party's model,
+# the join condition and the key prefix the templates expect.
+TIMELINES = {
+    'venue': (Show.venues_id, Artist, Show.artists_id == Artist.id, 'artist'),
+    'artist': (Show.artists_id, Venue, Show.venues_id == Venue.id, 'venue'),
+}
+
+
+def show_timeline(kind, entity_id, now=None):
+    # Every show of a venue or artist together with the other party, in a
+    # single joined query. Past/upcoming is decided by the database against
+    # one "now" so both lists agree with each other.
+    if now is None:
+        now = datetime.today()
+    column, other, onclause, prefix = TIMELINES[kind]
+    is_past = (Show.start_time < now).label('is_past')
+    rows = db.session.query(
+        Show.start_time,
+        other.id,
+        other.name,
+        other.image_link,
+        other.updated_at,
+        is_past,
+    ).join(
+        other, onclause
+    ).filter(
+        column == entity_id
+    ).order_by(
+        Show.start_time, Show.id
+    )
+    past_shows = []
+    upcoming_shows = []
+    for row in rows:
+        show = {
+            prefix + "_id": row.id,
+            prefix + "_name": row.name,
+            prefix + "_image_link": row.image_link,
+            prefix + "_updated_at": row.updated_at,
+            "start_time": row.start_time,
+        }
+        if row.is_past:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+    # most recent first for past shows, soonest first for upcoming ones
+    past_shows.reverse()
+    return {
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+
+#----------------------------------------------------------------------------#
+# Details.
+#----------------------------------------------------------------------------#
+
+
+def venue_detail(venue_id, now=None):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+    }
+    data.update(show_timeline('venue', venue.id, now))
+    return data
+
+
+def artist_detail(artist_id, now=None):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+    }
+    data.update(show_timeline('artist', artist.id, now))
+    return data
+
+
+#----------------------------------------------------------------------------#
+# Entity lists.
+#----------------------------------------------------------------------------#
+
+
+def entity_page(kind, after=None, per_page=30):
+    # Venues or artists in id order, one page after the `after` id.
+    model = Venue if kind == 'venue' else Artist
+    query = db.session.query(
+        model.id, model.name, model.city, model.state, model.image_link,
+        model.upcoming_shows_count,
+    ).order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.limit(per_page + 1).all()
+    return {
+        "data": [{
+            "id": row.id,
+            "name": row.name,
+            "city": row.city,
+            "state": row.state,
+            "image_link": row.image_link,
+            "num_upcoming_shows": row.upcoming_shows_count,
+        } for row in rows[:per_page]],
+        "next_cursor": rows[per_page - 1].id if len(rows) > per_page else None,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Keyset pages.
+#----------------------------------------------------------------------------#
+
+
+class KeysetPage(object):
+    # One page of a keyset-paginated listing, read lazily for streamed
+    # templates: iterating yields the page's items as rows come off a
+    # server-side cursor, and next_cursor / prev_cursor are known once the
+    # iteration is over (the pager is at the bottom of the page). `query`
+    # is already ordered, in reverse when walking back from `before`;
+    # those pages are buffered, at most per_page rows, to be flipped.
+
+    def __init__(self, query, per_page, after, before, item, encode):
+        self.query = query
+        self.per_page = per_page
+        self.after = after
+        self.before = before
+        self.item = item
+        self.encode = encode
+        self.first = self.last = None
+        self.has_more = False
+
+    def rows(self):
+        rows = self.query.limit(self.per_page + 1).execution_options(
+            stream_results=True).yield_per(YIELD_PER)
+        if self.before:
+            rows = rows.all()
+            self.has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+        for count, row in enumerate(rows):
+            if count == self.per_page:
+                self.has_more = True
+                break
+            yield row
+
+    def __iter__(self):
+        for row in self.rows():
+            if self.first is None:
+                self.first = row
+            self.last = row
+            yield self.item(row)
+
+    @property
+    def next_cursor(self):
+        if self.last is not None and (self.has_more or self.before):
+            return self.encode(self.last)
+        return None
+
+    @property
+    def prev_cursor(self):
+        if self.first is not None and ((self.has_more and self.before) or self.after):
+            return self.encode(self.first)
+        return None
+
+
+#----------------------------------------------------------------------------#
+# Artist index.
+#----------------------------------------------------------------------------#
+
+# jump points; names that don't start with a letter sort before "a"
+LETTERS = ['#'] + [chr(code) for code in range(ord('A'), ord('Z') + 1)]
+
+
+def encode_name_cursor(name, artist_id):
+    return '%s_%d' % ((name or '').lower(), artist_id)
+
+
+def decode_name_cursor(cursor):
+    # "<lower(name)>_<artist id>"; the id is after the last underscore
+    try:
+        name, artist_id = cursor.rsplit('_', 1)
+        return name, int(artist_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def artist_index(after=None, before=None, letter=None, state=None,
+                 seeking_venue=None, per_page=30):
+    # Artists sorted by name, with keyset pagination over (lower(name), id)
+    # on ix_artists_lower_name_id, or ix_artists_state_lower_name_id within a
+    # state. `letter` starts the listing at the first name with that letter.
+    # Returns a KeysetPage.
+    name = db.func.lower(Artist.name)
+    key = db.tuple_(name, Artist.id)
+    query = db.session.query(
+        Artist.id, Artist.name, Artist.city, Artist.state,
+        Artist.upcoming_shows_count, Artist.updated_at,
+    )
+    prefix = ()
+    if state:
+        # compare on the whole index key so the bound is an index condition
+        key = db.tuple_(Artist.state, name, Artist.id)
+        prefix = (state,)
+        query = query.filter(Artist.state == state)
+    if seeking_venue is not None:
+        query = query.filter(Artist.seeking_venue.is_(seeking_venue))
+    after = decode_name_cursor(after)
+    before = None if after else decode_name_cursor(before)
+    if not after and not before and letter and letter != '#':
+        after = (letter.lower(), 0)
+        query = query.filter(key >= prefix + after)
+    elif after:
+        query = query.filter(key > prefix + after)
+    if before:
+        query = query.filter(key < prefix + before).order_by(db.desc(name), db.desc(Artist.id))
+    else:
+        query = query.order_by(name, Artist.id)
+    return KeysetPage(query, per_page, after, before, artist_item,
+                      lambda row: encode_name_cursor(row.name, row.id))
+
+
+def artist_item(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "num_upcoming_shows": row.upcoming_shows_count,
+        "updated_at": row.updated_at,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Shows feed.
+#----------------------------------------------------------------------------#
+
+
+def encode_cursor(start_time, show_id):
+    return '%s_%d' % (start_time.isoformat(), show_id)
+
+
+def decode_cursor(cursor):
+    # Cursors are "<start_time iso>_<show id>"; anything else is ignored so a
+    # mangled link falls back to the first page instead of erroring.
+    try:
+        start_time, show_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def show_listing(after=None, before=None, per_page=30):
+    # Keyset pagination over (start_time, id), newest first. Each page is a
+    # range scan on ix_shows_start_time_id, so page N costs the same as page 1.
+    # Returns a KeysetPage.
+    key = db.tuple_(Show.start_time, Show.id)
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.updated_at.label('venue_updated_at'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Artist.updated_at.label('artist_updated_at'),
+    ).join(
+        Venue, Show.venues_id == Venue.id
+    ).join(
+        Artist, Show.artists_id == Artist.id
+    ).filter(
+        Show.start_time.isnot(None)
+    )
+    after = decode_cursor(after)
+    before = None if after else decode_cursor(before)
+    if before:
+        # walk backwards from the cursor, then flip the page back around
+        query = query.filter(key > before).order_by(
+            Show.start_time, Show.id)
+    else:
+        if after:
+            query = query.filter(key < after)
+        query = query.order_by(db.desc(Show.start_time), db.desc(Show.id))
+    return KeysetPage(query, per_page, after, before, show_item,
+                      lambda row: encode_cursor(row.start_time, row.id))
+
+
+def show_item(row):
+    return {
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "venue_updated_at": row.venue_updated_at,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "artist_updated_at": row.artist_updated_at,
+        "start_time": row.start_time,
+    }
+
+
+def show_page(after=None, before=None, per_page=30):
+    page = show_listing(after, before, per_page)
+    shows = list(page)
+    return {
+        "shows": shows,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Validators.
+#----------------------------------------------------------------------------#
+
+# Each validator is one round trip answering "when did this page last
+# change?" from the updated_at indexes. Detail pages also look at the latest
+# show that has started, since that is when it moved from upcoming to past,
+# and put the number of shows in the tag so a deleted show changes it too.
+
+
+def entity_validator(kind, entity_id, now=None):
+    if now is None:
+        now = datetime.today()
+    column, other, onclause, prefix = TIMELINES[kind]
+    model = Venue if kind == 'venue' else Artist
+    shows = db.session.query(Show).filter(column == entity_id)
+    row = db.session.query(
+        model.updated_at,
+        shows.with_entities(db.func.max(Show.updated_at)).scalar_subquery(),
+        shows.join(other, onclause).with_entities(
+            db.func.max(other.updated_at)).scalar_subquery(),
+        shows.filter(Show.start_time < now).with_entities(
+            db.func.max(Show.start_time)).scalar_subquery(),
+        shows.with_entities(db.func.count(Show.id)).scalar_subquery(),
+    ).filter(model.id == entity_id).first()
+    if row is None:
+        return None
+    last_modified = max(value for value in row[:4] if value is not None)
+    return last_modified, (kind, entity_id, row[4])
+
+
+def listing_validator(*models):
+    row = db.session.query(*[
+        db.session.query(db.func.max(model.updated_at)).scalar_subquery()
+        for model in models
+    ]).one()
+    stamps = [value for value in row if value is not None]
+    if not stamps:
+        return None
+    return max(stamps), tuple(row)
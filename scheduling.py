@@ -0,0 +1,246 @@
+from bisect import bisect_right, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Artist, Venue, Show
+from counters import recount
+
+# Double-booking checks for new shows. A show conflicts with any show at the
+# same venue, or by the same artist, starting less than
+# SHOW_CONFLICT_WINDOW_MINUTES before or after it. The check is a range scan
+# on ix_shows_venues_id_start_time / ix_shows_artists_id_start_time, so it
+# costs the same however many shows there are.
+#
+# Two submissions for the same venue or artist could both pass the check
+# before either commits. So the venue and artist rows are locked first
+# (venue then artist, the order the counters update them in): a concurrent
+# booking for either waits until this transaction ends, then sees its show.
+
+
+NAMES = {
+    'venues': 'la salle',
+    'artists': 'l\'artiste',
+}
+
+
+class SchedulingError(Exception):
+
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+def conflict_window():
+    return timedelta(minutes=current_app.config.get('SHOW_CONFLICT_WINDOW_MINUTES', 180))
+
+
+def lock_entities(venue_ids, artist_ids):
+    # FOR NO KEY UPDATE, in id order, and report ids that don't exist
+    missing = []
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        ids = sorted(set(ids))
+        found = set(row.id for row in db.session.query(model.id).filter(
+            model.id.in_(ids)).order_by(model.id).with_for_update(key_share=True))
+        missing.extend((model.__tablename__, entity_id)
+                       for entity_id in ids if entity_id not in found)
+    return missing
+
+
+def find_conflicts(venue_id, artist_id, start_time, window=None):
+    if window is None:
+        window = conflict_window()
+    lower, upper = start_time - window, start_time + window
+    return db.session.query(
+        Show.id, Show.start_time, Show.venues_id, Show.artists_id,
+    ).filter(
+        db.or_(
+            db.and_(Show.venues_id == venue_id,
+                    Show.start_time > lower, Show.start_time < upper),
+            db.and_(Show.artists_id == artist_id,
+                    Show.start_time > lower, Show.start_time < upper),
+        )
+    ).order_by(Show.start_time).all()
+
+
+def describe(conflicts, venue_id):
+    conflict = conflicts[0]
+    if conflict.venues_id == venue_id:
+        return 'la salle a déjà un show le %s' % conflict.start_time.strftime('%Y-%m-%d à %H:%M')
+    return 'l\'artiste joue déjà le %s' % conflict.start_time.strftime('%Y-%m-%d à %H:%M')
+
+
+def book_show(venue_id, artist_id, start_time):
+    # Add the show to the session once it's clear of conflicts. The caller
+    # commits (which releases the locks) or rolls back.
+    missing = lock_entities([venue_id], [artist_id])
+    if missing:
+        table, entity_id = missing[0]
+        raise SchedulingError('%s %d n\'existe pas' % (NAMES[table], entity_id))
+    conflicts = find_conflicts(venue_id, artist_id, start_time)
+    if conflicts:
+        raise SchedulingError(describe(conflicts, venue_id), conflicts)
+    show = Show(venues_id=venue_id, artists_id=artist_id, start_time=start_time)
+    db.session.add(show)
+    return show
+
+
+#  Tours
+#  ----------------------------------------------------------------
+
+# A tour or residency books one artist for many (venue, start_time) dates in
+# one transaction: one IN query locks and resolves every venue, one query
+# finds the existing shows each date would clash with, and the accepted
+# dates go in with a single multi-row INSERT. Dates are also checked
+# against each other.
+
+
+def batch_conflicts(shows, window):
+    # {index: first clashing show} for (index, venue_id, artist_id,
+    # start_time) tuples, via a VALUES list joined to shows on the same
+    # range scans find_conflicts uses
+    if not shows:
+        return {}
+    batch = db.values(
+        db.column('idx', db.Integer),
+        db.column('venue_id', db.Integer),
+        db.column('artist_id', db.Integer),
+        db.column('start_time', db.DateTime),
+        name='batch',
+    ).data(list(shows))
+    in_window = db.and_(Show.start_time > batch.c.start_time - window,
+                        Show.start_time < batch.c.start_time + window)
+    columns = (batch.c.idx, Show.id, Show.start_time, Show.venues_id, Show.artists_id)
+    venue_side = db.session.query(*columns).select_from(batch).join(
+        Show, db.and_(Show.venues_id == batch.c.venue_id, in_window))
+    artist_side = db.session.query(*columns).select_from(batch).join(
+        Show, db.and_(Show.artists_id == batch.c.artist_id, in_window))
+    conflicts = {}
+    for row in venue_side.union_all(artist_side).order_by(Show.start_time):
+        conflicts.setdefault(row.idx, row)
+    return conflicts
+
+
+def tour_conflicts(artist_id, dates, window):
+    return batch_conflicts([(index, venue_id, artist_id, start_time)
+                            for index, (venue_id, start_time) in dates], window)
+
+
+def clashes(times, start_time, window):
+    # the first time in sorted `times` less than `window` away, if any
+    position = bisect_right(times, start_time - window)
+    if position < len(times) and times[position] < start_time + window:
+        return times[position]
+    return None
+
+
+def rejected(error, **details):
+    return dict(status='rejected', error=error, **details)
+
+
+def book_tour(artist_id, dates, atomic=False):
+    # `dates` is a list of (venue_id, start_time), or None for dates the
+    # caller couldn't parse. Returns one result per date, in order. Unless
+    # `atomic` is set and a date was rejected, the accepted dates are
+    # inserted; the caller commits.
+    window = conflict_window()
+    valid = [(index, date) for index, date in enumerate(dates) if date is not None]
+    missing = lock_entities([venue_id for index, (venue_id, start_time) in valid], [artist_id])
+    if ('artists', artist_id) in missing:
+        raise SchedulingError('l\'artiste %d n\'existe pas' % artist_id)
+    missing_venues = set(entity_id for table, entity_id in missing)
+    conflicts = tour_conflicts(artist_id, [
+        (index, date) for index, date in valid if date[0] not in missing_venues], window)
+    venue_times = defaultdict(list)
+    artist_times = []
+    results = []
+    accepted = []
+    for index, date in enumerate(dates):
+        if date is None:
+            results.append(rejected('invalid'))
+            continue
+        venue_id, start_time = date
+        conflict = conflicts.get(index)
+        if venue_id in missing_venues:
+            result = rejected('unknown_venue')
+        elif conflict is not None:
+            result = rejected(
+                'venue_conflict' if conflict.venues_id == venue_id else 'artist_conflict',
+                conflict={"show_id": conflict.id, "venue_id": conflict.venues_id,
+                          "start_time": conflict.start_time})
+        elif clashes(venue_times[venue_id], start_time, window):
+            result = rejected('venue_conflict', conflict={
+                "start_time": clashes(venue_times[venue_id], start_time, window)})
+        elif clashes(artist_times, start_time, window):
+            result = rejected('artist_conflict', conflict={
+                "start_time": clashes(artist_times, start_time, window)})
+        else:
+            result = {"status": "created"}
+            insort(venue_times[venue_id], start_time)
+            insort(artist_times, start_time)
+            accepted.append((result, venue_id, start_time))
+        results.append(result)
+    if atomic and len(accepted) < len(dates):
+        for result, venue_id, start_time in accepted:
+            result['status'] = 'skipped'
+        return results
+    if accepted:
+        now = datetime.now()
+        ids = db.session.execute(Show.__table__.insert().values([{
+            'venues_id': venue_id,
+            'artists_id': artist_id,
+            'start_time': start_time,
+            'counted_past': start_time < now,
+        } for result, venue_id, start_time in accepted]).returning(Show.id)).fetchall()
+        # the rows of the VALUES list draw their ids from the sequence in
+        # order, so the sorted ids line up with `accepted` (two dates may
+        # share a venue and time when SHOW_CONFLICT_WINDOW_MINUTES is 0)
+        for (result, venue_id, start_time), show_id in zip(accepted, sorted(row.id for row in ids)):
+            result['show_id'] = show_id
+        # the insert bypasses the ORM events that keep the counters
+        recount(Venue, [venue_id for result, venue_id, start_time in accepted])
+        recount(Artist, [artist_id])
+    return results
+
+
+#  Imports
+#  ----------------------------------------------------------------
+
+# `flask import shows` runs every batch through the same checks: one IN
+# query per side locks the venues and artists, one VALUES join finds the
+# existing shows each row clashes with, and the rows are checked against
+# each other.
+
+
+def check_batch(shows):
+    # Lock the venues and artists of (venue_id, artist_id, start_time)
+    # shows, then return {index: error} for the ones naming a
+    # missing row, clashing with an existing show or with an earlier show
+    # of the batch. The caller inserts the others and commits.
+    window = conflict_window()
+    missing = set(lock_entities([venue_id for venue_id, artist_id, start_time in shows],
+                                [artist_id for venue_id, artist_id, start_time in shows]))
+    conflicts = batch_conflicts([
+        (index, venue_id, artist_id, start_time)
+        for index, (venue_id, artist_id, start_time) in enumerate(shows)
+        if ('venues', venue_id) not in missing and ('artists', artist_id) not in missing], window)
+    venue_times = defaultdict(list)
+    artist_times = defaultdict(list)
+    errors = {}
+    for index, (venue_id, artist_id, start_time) in enumerate(shows):
+        unknown = [table for table, entity_id in (('venues', venue_id), ('artists', artist_id))
+                   if (table, entity_id) in missing]
+        if unknown:
+            errors[index] = '%s %d n\'existe pas' % (
+                NAMES[unknown[0]], venue_id if unknown[0] == 'venues' else artist_id)
+        elif index in conflicts:
+            errors[index] = describe([conflicts[index]], venue_id)
+        elif clashes(venue_times[venue_id], start_time, window):
+            errors[index] = 'la salle a déjà un show le %s' % clashes(
+                venue_times[venue_id], start_time, window).strftime('%Y-%m-%d à %H:%M')
+        elif clashes(artist_times[artist_id], start_time, window):
+            errors[index] = 'l\'artiste joue déjà le %s' % clashes(
+                artist_times[artist_id], start_time, window).strftime('%Y-%m-%d à %H:%M')
+        else:
+            insort(venue_times[venue_id], start_time)
+            insort(artist_times[artist_id], start_time)
+    return errors
@@ -0,0 +1,152 @@
+import re
+from models import db, Artist, Venue
+from forms import VenueForm
+
+# Search for venues and artists. Names go through the pg_trgm GIN indexes
+# on venues.name and artists.name, "City, ST" through the (state, city)
+# indexes and genres through the GIN indexes on the genres arrays. Ranking,
+# per-type caps and the total number of matches come back in a single
+# statement; upcoming show counts are read from the counter columns.
+#
+# Terms shorter than MIN_TRIGRAM_TERM give pg_trgm no trigram to look up,
+# so they would scan and rank the whole table: they only match names
+# starting with them, through the lower(name) prefix indexes, and an empty
+# term matches nothing. Counting every name with a one or two letter prefix
+# would still read a good part of the index, so these searches fetch one
+# row more than they show and only report whether there are more matches
+# ("more") instead of the total.
+
+MIN_TRIGRAM_TERM = 3
+
+SEARCHES = {
+    'venue': Venue,
+    'artist': Artist,
+}
+
+GENRES = dict((value.lower(), value)
+              for value, label in VenueForm.genres.kwargs['choices'])
+
+CITY_STATE = re.compile(r'^\s*(.+?)\s*,\s*([A-Za-z]{2})\s*$')
+
+
+def escape_like(term):
+    # match the term literally, not as a LIKE pattern
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def like_pattern(term):
+    return '%' + escape_like(term) + '%'
+
+
+def ranked(kind, criteria, rank, limit):
+    # The best `limit` matches of one type, with the total number of matches
+    model = SEARCHES[kind]
+    return db.session.query(
+        db.literal(kind).label('kind'),
+        model.id,
+        model.name,
+        model.upcoming_shows_count,
+        model.updated_at,
+        rank.label('rank'),
+        db.func.count().over().label('total'),
+    ).filter(
+        criteria
+    ).order_by(
+        db.desc(rank), model.name, model.id
+    ).limit(limit)
+
+
+def prefix_ranked(kind, term, limit):
+    # the first `limit` + 1 names starting with a short term, in name
+    # order, without a total
+    model = SEARCHES[kind]
+    name = db.func.lower(model.name)
+    return db.session.query(
+        db.literal(kind).label('kind'),
+        model.id,
+        model.name,
+        model.upcoming_shows_count,
+        model.updated_at,
+        db.literal(0).label('rank'),
+        db.null().label('total'),
+    ).filter(
+        name.like(escape_like(term.lower()) + '%')
+    ).order_by(
+        name, model.id
+    ).limit(limit + 1)
+
+
+def collect(rows, kinds, limit=None):
+    # with `limit`, rows are prefix_ranked ones: the extra row of each type
+    # is dropped and sets "more", and count is the number of rows shown
+    results = dict((kind, {"count": 0, "more": False, "data": []}) for kind in kinds)
+    if limit is not None:
+        kept = []
+        for kind in kinds:
+            matches = sorted((row for row in rows if row.kind == kind),
+                             key=lambda row: (row.name.lower(), row.id))
+            results[kind]["count"] = min(len(matches), limit)
+            results[kind]["more"] = len(matches) > limit
+            kept.extend(matches[:limit])
+        rows = kept
+    for row in sorted(rows, key=lambda row: (-row.rank, row.name, row.id)):
+        if row.total is not None:
+            results[row.kind]["count"] = row.total
+        results[row.kind]["data"].append({
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.upcoming_shows_count,
+            "updated_at": row.updated_at,
+        })
+    return results
+
+
+def search_by_name(kind, term, limit=20):
+    model = SEARCHES[kind]
+    term = term.strip()
+    if not term:
+        return collect([], [kind])[kind]
+    if len(term) < MIN_TRIGRAM_TERM:
+        return collect(prefix_ranked(kind, term, limit).all(), [kind], limit)[kind]
+    rows = ranked(
+        kind,
+        model.name.ilike(like_pattern(term)),
+        db.func.similarity(model.name, term),
+        limit,
+    ).all()
+    return collect(rows, [kind])[kind]
+
+
+def search_all(term, limit=20):
+    # One endpoint for everything: a term matches a venue or an artist by
+    # name, by "City, ST" and by genre. Structured matches (place, genre)
+    # outrank fuzzy name matches. Both types are capped at `limit` each and
+    # fetched with a single UNION ALL.
+    term = term.strip()
+    if not term:
+        return collect([], SEARCHES)
+    if len(term) < MIN_TRIGRAM_TERM:
+        # too short for a place or a genre too
+        queries = [prefix_ranked(kind, term, limit) for kind in SEARCHES]
+        return collect(queries[0].union_all(*queries[1:]).all(), SEARCHES, limit)
+    place = CITY_STATE.match(term)
+    genre = GENRES.get(term.lower())
+    queries = []
+    for kind, model in SEARCHES.items():
+        name_match = model.name.ilike(like_pattern(term))
+        criteria = [name_match]
+        rank = db.case((name_match, db.func.similarity(model.name, term)),
+                       else_=0)
+        if place:
+            place_match = db.and_(
+                model.state == place.group(2).upper(),
+                db.func.lower(model.city) == place.group(1).lower())
+            criteria.append(place_match)
+            rank = rank + db.case((place_match, 1), else_=0)
+        if genre:
+            genre_match = model.genres.contains([genre])
+            criteria.append(genre_match)
+            rank = rank + db.case((genre_match, 1), else_=0)
+        queries.append(ranked(kind, db.or_(*criteria), rank, limit))
+    rows = queries[0].union_all(*queries[1:]).all()
+    return collect(rows, SEARCHES)
@@ -0,0 +1,60 @@
+import sys
+from flask import Blueprint, render_template, request, flash, current_app
+from models import db, Artist, Venue, Show
+from forms import ShowForm
+from queries import show_listing, listing_validator
+from conditional import conditional
+from database import read_only
+from scheduling import book_show, SchedulingError
+from streaming import stream_page
+from extensions import cache
+
+shows = Blueprint('shows', __name__, url_prefix='/shows')
+
+
+@shows.route('')
+@read_only
+@conditional(lambda: listing_validator(Show, Venue, Artist))
+@cache.cached('shows', query_string=True)
+def index():
+    per_page = min(
+        request.args.get('per_page', current_app.config['SHOWS_PER_PAGE'], type=int),
+        current_app.config['MAX_PER_PAGE'])
+    page = show_listing(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=max(per_page, 1))
+    return stream_page('pages/shows.html', page=page)
+
+    # CREATE SHOW
+
+
+@shows.route('/create')
+def create_form():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@shows.route('/create', methods=['POST'])
+def create_submission():
+    try:
+        form = ShowForm()
+        if form.validate_on_submit():
+            book_show(form.venue_id.data, form.artist_id.data, form.start_time.data)
+            db.session.commit()
+            cache.show_changed(form.venue_id.data, form.artist_id.data)
+            flash('Le show a été crée!')
+        else:
+            return render_template('forms/new_show.html', form=form)
+    except SchedulingError as error:
+        db.session.rollback()
+        flash('Le show n\'a pas été crée : %s.' % error)
+        return render_template('forms/new_show.html', form=form)
+    except:
+        print(sys.exc_info())
+        db.session.rollback()
+        flash('Le show n\'a pas été crée ! Un problème est survenu')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
@@ -2,3 +2,39 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Venue/artist pickers: suggest names from /api/v1/typeahead as the user
+// types, and fill the ID field when a suggestion is picked.
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input.typeahead');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var options = document.getElementById(input.getAttribute('list'));
+    var target = document.getElementById(input.getAttribute('data-target'));
+    var pending = null;
+    var ids = {};
+    input.addEventListener('input', function () {
+      var term = input.value.trim();
+      if (ids.hasOwnProperty(input.value)) {
+        target.value = ids[input.value];
+        return;
+      }
+      clearTimeout(pending);
+      if (!term) return;
+      pending = setTimeout(function () {
+        fetch('/api/v1/typeahead/' + input.getAttribute('data-kind') + '?q=' + encodeURIComponent(term))
+          .then(function (response) { return response.json(); })
+          .then(function (body) {
+            ids = {};
+            options.innerHTML = '';
+            body.data.forEach(function (match) {
+              // the id keeps two venues or artists of the same name apart
+              var option = document.createElement('option');
+              option.value = match.name + ' (#' + match.id + ')';
+              ids[option.value] = match.id;
+              options.appendChild(option);
+            });
+          });
+      }, 150);
+    });
+  });
+});
@@ -0,0 +1,127 @@
+import zlib
+from flask import current_app, request, stream_template
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Streamed, compressed pages. stream_page renders a template as it goes
+# instead of building the whole page first: Jinja's output is gathered into
+# STREAM_BUFFER_SIZE pieces and sent as soon as each is full, so the first
+# byte leaves after the first few rows whatever the size of the listing,
+# and a worker only ever holds one piece (the rows come off server-side
+# cursors, see queries.py).
+#
+# Compress encodes responses with brotli (when installed) or gzip, per the
+# request's Accept-Encoding. Streamed bodies are compressed chunk by chunk,
+# each flushed so the client gets it right away; whole bodies at once.
+
+
+def buffered(chunks, size):
+    buffer = []
+    length = 0
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield ''.join(buffer)
+                buffer = []
+                length = 0
+        if buffer:
+            yield ''.join(buffer)
+    finally:
+        # a client that went away stops the rendering right here
+        chunks.close()
+
+
+def stream_page(template, **context):
+    # the streaming counterpart of render_template, for views returning it
+    return buffered(stream_template(template, **context),
+                    current_app.config.get('STREAM_BUFFER_SIZE', 8192))
+
+
+#  Compression
+#  ----------------------------------------------------------------
+
+def gzip_compressor(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush)
+
+
+def brotli_compressor(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return (lambda data: compressor.process(data) + compressor.flush(),
+            compressor.finish)
+
+
+def compress_stream(body, charset, compress, finish):
+    try:
+        for chunk in body:
+            data = compress(chunk.encode(charset) if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # ends the template stream (and the request context it holds)
+        if hasattr(body, 'close'):
+            body.close()
+
+
+class Compress(object):
+
+    def __init__(self, app=None):
+        self.mimetypes = ()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.mimetypes = app.config.get('COMPRESS_MIMETYPES', ('text/html', 'application/json'))
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+        app.extensions['compress'] = self
+        if app.config.get('COMPRESS', True):
+            app.after_request(self.compress)
+
+    def encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return brotli_compressor(self.brotli_quality)
+        return gzip_compressor(self.level)
+
+    def compress(self, response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.encoding()
+        if encoding is None:
+            return response
+        if not response.is_streamed:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compress, finish = self.compressor(encoding)
+            response.set_data(compress(data) + finish())
+        else:
+            compress, finish = self.compressor(encoding)
+            response.response = compress_stream(
+                response.response, response.charset, compress, finish)
+            response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        # the encoded body isn't byte for byte what the validators describe
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,49 @@
+import pytest
+from app import create_app
+from models import db, Artist, Venue, Show
+
+# The tests run against the database of DATABASE_URL (see config.py), with
+# the migrations applied. Each test creates its own venues and artists and
+# books shows between them only, far in the future unless it needs past
+# ones; they are deleted afterwards, so the rest of the data is left alone.
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, SHOW_CONFLICT_WINDOW_MINUTES=180)
+    with app.app_context():
+        yield app
+        db.session.rollback()
+
+
+@pytest.fixture
+def make(app):
+    created = {Venue: [], Artist: []}
+
+    def make(model):
+        entity = model(name='Test %s %d' % (model.__tablename__, len(created[model])),
+                       city='Testville', state='CA', genres=['Other'])
+        db.session.add(entity)
+        db.session.commit()
+        created[model].append(entity.id)
+        return entity
+
+    yield make
+    db.session.rollback()
+    Show.query.filter(db.or_(
+        Show.venues_id.in_(created[Venue]), Show.artists_id.in_(created[Artist]),
+    )).delete(synchronize_session=False)
+    for model, ids in created.items():
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+@pytest.fixture
+def venue(make):
+    return make(Venue)
+
+
+@pytest.fixture
+def artist(make):
+    return make(Artist)
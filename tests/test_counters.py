@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from models import db, Artist, Venue, Show
+from counters import recount, sweep
+
+FUTURE = datetime(2095, 6, 1, 20, 0)
+PAST = datetime(2001, 6, 1, 20, 0)
+
+
+def counts(*entities):
+    db.session.expire_all()
+    return [(entity.upcoming_shows_count, entity.past_shows_count) for entity in entities]
+
+
+def add_show(venue, artist, start_time):
+    show = Show(venues_id=venue.id, artists_id=artist.id, start_time=start_time)
+    db.session.add(show)
+    db.session.commit()
+    return show
+
+
+def test_insert_counts_upcoming_and_past_shows(venue, artist):
+    add_show(venue, artist, FUTURE)
+    add_show(venue, artist, PAST)
+    add_show(venue, artist, FUTURE + timedelta(days=1))
+    assert counts(venue, artist) == [(2, 1), (2, 1)]
+
+
+def test_update_moves_the_show_between_counters(make, venue, artist):
+    show = add_show(venue, artist, FUTURE)
+    other_venue, other_artist = make(Venue), make(Artist)
+    show.venues_id = other_venue.id
+    db.session.commit()
+    assert counts(venue, other_venue, artist) == [(0, 0), (1, 0), (1, 0)]
+    show.artists_id = other_artist.id
+    show.start_time = PAST
+    db.session.commit()
+    assert counts(other_venue, artist, other_artist) == [(0, 1), (0, 0), (0, 1)]
+
+
+def test_delete_uncounts_the_show(venue, artist):
+    upcoming = add_show(venue, artist, FUTURE)
+    past = add_show(venue, artist, PAST)
+    db.session.delete(upcoming)
+    db.session.commit()
+    assert counts(venue, artist) == [(0, 1), (0, 1)]
+    db.session.delete(past)
+    db.session.commit()
+    assert counts(venue, artist) == [(0, 0), (0, 0)]
+
+
+def test_sweep_moves_started_shows_to_past(venue, artist):
+    show = add_show(venue, artist, FUTURE)
+    started = datetime.now() - timedelta(minutes=5)
+    # time passing: the show starts without anything writing to it
+    db.session.execute(Show.__table__.update().where(Show.id == show.id).values(start_time=started))
+    db.session.commit()
+    assert counts(venue, artist) == [(1, 0), (1, 0)]
+    assert sweep() >= 1
+    assert counts(venue, artist) == [(0, 1), (0, 1)]
+    assert show.counted_past is True
+    # a second sweep finds nothing more of theirs to move
+    sweep()
+    assert counts(venue, artist) == [(0, 1), (0, 1)]
+
+
+def test_recount_matches_the_events(venue, artist):
+    add_show(venue, artist, FUTURE)
+    add_show(venue, artist, PAST)
+    before = counts(venue, artist)
+    recount(Venue, [venue.id])
+    recount(Artist, [artist.id])
+    db.session.commit()
+    assert counts(venue, artist) == before
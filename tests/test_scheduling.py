@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from models import db, Artist, Venue
+from scheduling import book_show, book_tour, check_batch, find_conflicts
+
+START = datetime(2095, 6, 1, 20, 0)
+WINDOW = timedelta(minutes=180)
+MINUTE = timedelta(minutes=1)
+
+
+def booked(venue, artist, start_time=START):
+    show = book_show(venue.id, artist.id, start_time)
+    db.session.commit()
+    return show
+
+
+#  Conflict window
+#  ----------------------------------------------------------------
+
+def test_shows_a_full_window_apart_dont_conflict(make, venue, artist):
+    booked(venue, artist)
+    other_venue, other_artist = make(Venue), make(Artist)
+    for start_time in (START - WINDOW, START + WINDOW):
+        assert find_conflicts(venue.id, other_artist.id, start_time) == []
+        assert find_conflicts(other_venue.id, artist.id, start_time) == []
+
+
+def test_shows_less_than_a_window_apart_conflict(make, venue, artist):
+    show = booked(venue, artist)
+    other_venue, other_artist = make(Venue), make(Artist)
+    for start_time in (START - WINDOW + MINUTE, START, START + WINDOW - MINUTE):
+        assert [row.id for row in find_conflicts(venue.id, other_artist.id, start_time)] == [show.id]
+        assert [row.id for row in find_conflicts(other_venue.id, artist.id, start_time)] == [show.id]
+
+
+def test_batch_uses_the_same_window_boundaries(make, venue, artist):
+    booked(venue, artist)
+    other_artist = make(Artist)
+    errors = check_batch([
+        (venue.id, other_artist.id, START - WINDOW),
+        (venue.id, other_artist.id, START + WINDOW - MINUTE),
+    ])
+    assert list(errors) == [1]
+
+
+def test_window_follows_the_setting(app, make, venue, artist):
+    booked(venue, artist)
+    app.config['SHOW_CONFLICT_WINDOW_MINUTES'] = 60
+    assert find_conflicts(venue.id, make(Artist).id, START + timedelta(minutes=60)) == []
+
+
+#  Clashes within a tour or an import batch
+#  ----------------------------------------------------------------
+
+def test_tour_dates_clash_with_each_other(make, artist):
+    first, second = make(Venue), make(Venue)
+    results = book_tour(artist.id, [
+        (first.id, START),
+        (second.id, START + WINDOW - MINUTE),
+        (second.id, START + WINDOW),
+    ])
+    assert [result['status'] for result in results] == ['created', 'rejected', 'created']
+    assert results[1]['error'] == 'artist_conflict'
+    assert results[1]['conflict'] == {"start_time": START}
+
+
+def test_atomic_tour_books_nothing_on_a_clash(make, venue, artist):
+    results = book_tour(artist.id, [(venue.id, START), (venue.id, START + MINUTE)], atomic=True)
+    assert [result['status'] for result in results] == ['skipped', 'rejected']
+    db.session.commit()
+    db.session.refresh(venue)
+    assert venue.upcoming_shows_count == 0
+
+
+def test_import_batch_rows_clash_with_each_other(make, venue, artist):
+    other_venue, other_artist = make(Venue), make(Artist)
+    errors = check_batch([
+        (venue.id, artist.id, START),
+        (venue.id, other_artist.id, START + MINUTE),
+        (other_venue.id, artist.id, START + 2 * MINUTE),
+        (other_venue.id, other_artist.id, START + WINDOW),
+    ])
+    assert sorted(errors) == [1, 2]
+    assert errors[1].startswith('la salle a déjà un show')
+    assert errors[2].startswith('l\'artiste joue déjà')
+
+
+def test_import_batch_rejected_rows_dont_block_later_ones(venue, artist):
+    # a row rejected for a clash isn't booked, so it can't clash itself
+    errors = check_batch([
+        (venue.id, artist.id, START),
+        (venue.id, artist.id, START + WINDOW - MINUTE),
+        (venue.id, artist.id, START + WINDOW + 30 * MINUTE),
+    ])
+    assert list(errors) == [1]
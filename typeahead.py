@@ -0,0 +1,127 @@
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from models import db, Artist, Venue
+from search import escape_like
+from cache import LRUCache
+
+# Name typeahead for the venue and artist pickers. Matches are names
+# starting with the typed text, in name order, TYPEAHEAD_LIMIT at most,
+# read through the lower(name) text_pattern_ops indexes.
+#
+# Results for prefixes up to TYPEAHEAD_PREFIX_LENGTH characters, which are
+# the ones typed most, are kept in memory. When a venue or artist is created
+# or renamed, the cached prefixes of its old and new names are patched once
+# the transaction commits, without going back to the database. Other worker
+# processes catch up when their entries expire (TYPEAHEAD_CACHE_TIMEOUT).
+
+TYPES = {
+    'venue': Venue,
+    'artist': Artist,
+}
+
+KINDS = dict((model, kind) for kind, model in TYPES.items())
+
+
+def sort_key(entry):
+    return (entry['name'] or '').lower(), entry['id']
+
+
+class Typeahead(object):
+
+    def __init__(self, app=None):
+        self.limit = 10
+        self.prefix_length = 3
+        self.prefixes = LRUCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.limit = app.config.get('TYPEAHEAD_LIMIT', 10)
+        self.prefix_length = app.config.get('TYPEAHEAD_PREFIX_LENGTH', 3)
+        self.prefixes = LRUCache(
+            max_entries=app.config.get('TYPEAHEAD_CACHE_SIZE', 4096),
+            default_timeout=app.config.get('TYPEAHEAD_CACHE_TIMEOUT', 300))
+        for model in TYPES.values():
+            event.listen(model, 'after_insert', self.entity_written)
+            event.listen(model, 'after_update', self.entity_written)
+        event.listen(Session, 'after_commit', self.committed)
+        event.listen(Session, 'after_rollback', self.rolled_back)
+        app.extensions['typeahead'] = self
+
+    def query(self, kind, prefix):
+        model = TYPES[kind]
+        rows = db.session.query(model.id, model.name).filter(
+            db.func.lower(model.name).like(escape_like(prefix) + '%')
+        ).order_by(db.func.lower(model.name), model.id).limit(self.limit)
+        return [{"id": row.id, "name": row.name} for row in rows]
+
+    def lookup(self, kind, term):
+        prefix = term.strip().lower()
+        if not prefix:
+            return []
+        if len(prefix) > self.prefix_length:
+            # a cached shorter prefix holding every match can be filtered
+            shorter = self.prefixes.get(kind + ':' + prefix[:self.prefix_length])
+            if shorter is not None and len(shorter) < self.limit:
+                return [entry for entry in shorter
+                        if (entry['name'] or '').lower().startswith(prefix)]
+            return self.query(kind, prefix)
+        key = kind + ':' + prefix
+        entries = self.prefixes.get(key)
+        if entries is None:
+            entries = self.query(kind, prefix)
+            self.prefixes.set(key, entries)
+        return entries
+
+    #  Incremental refresh
+    #  ----------------------------------------------------------------
+
+    def entity_written(self, mapper, connection, target):
+        history = get_history(target, 'name')
+        if not history.has_changes():
+            return
+        old_name = history.deleted[0] if history.deleted else None
+        session = object_session(target)
+        session.info.setdefault('typeahead', []).append(
+            (KINDS[type(target)], target.id, target.name, old_name))
+
+    def committed(self, session):
+        for change in session.info.pop('typeahead', []):
+            self.refresh(*change)
+
+    def rolled_back(self, session):
+        session.info.pop('typeahead', None)
+
+    def refresh(self, kind, entity_id, name, old_name):
+        prefixes = set()
+        for value in (name, old_name):
+            value = (value or '').lower()
+            prefixes.update(value[:length] for length in range(1, min(len(value), self.prefix_length) + 1))
+        for prefix in prefixes:
+            key = kind + ':' + prefix
+            entries = self.prefixes.get(key)
+            if entries is not None:
+                entries = self.patch(entries, prefix, entity_id, name)
+                if entries is None:
+                    self.prefixes.delete(key)
+                else:
+                    self.prefixes.set(key, entries)
+
+    def patch(self, entries, prefix, entity_id, name):
+        # The cached list is the first `limit` matches, or all of them when
+        # shorter. Returns the patched list, or None when it can't be
+        # patched without knowing what comes after its last entry.
+        full = len(entries) >= self.limit
+        kept = [entry for entry in entries if entry['id'] != entity_id]
+        removed = len(kept) < len(entries)
+        if not (name or '').lower().startswith(prefix):
+            return None if full and removed else kept
+        entry = {"id": entity_id, "name": name}
+        position = bisect_left([sort_key(item) for item in kept], sort_key(entry))
+        if full and position == len(kept):
+            # sorts after every cached match
+            return None if removed else kept
+        kept.insert(position, entry)
+        return kept[:self.limit]
@@ -0,0 +1,179 @@
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app
+from models import db, Venue
+from forms import VenueForm
+from queries import venue_areas, venue_detail, entity_validator, listing_validator
+from search import search_by_name
+from conditional import conditional
+from database import read_only
+from streaming import stream_page
+from extensions import cache
+
+venues = Blueprint('venues', __name__, url_prefix='/venues')
+
+
+@venues.route('')
+@read_only
+@conditional(lambda: listing_validator(Venue))
+@cache.cached('venues')
+def index():
+    return stream_page('pages/venues.html', areas=venue_areas())
+
+
+@venues.route('/search', methods=['POST'])
+@read_only
+def search():
+    results = search_by_name('venue', request.form.get('search_term', ''),
+                             limit=current_app.config['SEARCH_LIMIT'])
+    return render_template('pages/search_venues.html', results=results, search_term=request.form.get('search_term', ''))
+
+
+@venues.route('/<int:venue_id>')
+@read_only
+@conditional(lambda venue_id: entity_validator('venue', venue_id))
+@cache.cached('venue:{venue_id}')
+def show(venue_id):
+    data = venue_detail(venue_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venues.route('/create', methods=['GET'])
+def create_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/create', methods=['POST'])
+def create_submission():
+    try:
+        form = VenueForm()
+        if form.validate_on_submit():
+            if form.seeking_talent.data:
+                venue = Venue(
+                    name=form.name.data,
+                    city=form.city.data,
+                    address=form.address.data,
+                    state=form.state.data,
+                    phone=form.phone.data,
+                    genres=form.genres.data,
+                    facebook_link=form.facebook_link.data,
+                    image_link=form.image_link.data,
+                    website_link=form.website_link.data,
+                    seeking_talent=form.seeking_talent.data,
+                    seeking_description=form.seeking_description.data,)
+                db.session.add(venue)
+                db.session.commit()
+            else:
+                venue = Venue(
+                    name=form.name.data,
+                    city=form.city.data,
+                    address=form.address.data,
+                    state=form.state.data,
+                    phone=form.phone.data,
+                    genres=form.genres.data,
+                    facebook_link=form.facebook_link.data,
+                    image_link=form.image_link.data,
+                    website_link=form.website_link.data,
+                    seeking_description=form.seeking_description.data,)
+                db.session.add(venue)
+                db.session.commit()
+            cache.venue_changed()
+            # on successful db insert, flash success
+            flash('Venue ' + form.name.data + ' a été ajouté')
+        else:
+            return render_template('submit.html', form=form)
+    except:
+        print(sys.exc_info())
+        db.session.rollback()
+        flash('Venue ' + form.name.data +
+              ' n\'a pas été crée. Une erreur s\'est produite.')
+    finally:
+        db.session.close()
+# TODO: on unsuccessful db insert, flash an error instead.
+# e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+# see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
+
+
+@venues.route('/<venue_id>', methods=['DELETE'])
+def delete(venue_id):
+    return None
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@venues.route('/<int:venue_id>/edit', methods=['GET'])
+def edit(venue_id):
+    venu = Venue.query.get(venue_id)
+    form = VenueForm()
+    venue = {
+        "id": venu.id,
+        "name": venu.name,
+        "genres": venu.genres,
+        "address": venu.address,
+        "city": venu.city,
+        "state": venu.state,
+        "phone": venu.phone,
+        "website": venu.website_link,
+        "facebook_link": venu.facebook_link,
+        "seeking_talent": venu.seeking_talent,
+        "seeking_description": venu.seeking_description,
+        "image_link": venu.image_link
+    }
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venues.route('/<int:venue_id>/edit', methods=['POST'])
+def edit_submission(venue_id):
+    try:
+        form = VenueForm()
+        if form.validate_on_submit():
+            venue = Venue.query.get(venue_id)
+            if form.seeking_talent.data:
+                venue.name = form.name.data
+                venue.city = form.city.data
+                venue.address = form.address.data
+                venue.state = form.state.data
+                venue.phone = form.phone.data
+                venue.genres = form.genres.data
+                venue.facebook_link = form.facebook_link.data
+                venue.image_link = form.image_link.data
+                venue.website_link = form.website_link.data
+                venue.seeking_talent = form.seeking_talent.data
+                venue.seeking_description = form.seeking_description.data
+                db.session.add(venue)
+                db.session.commit()
+                cache.venue_changed(venue_id)
+                flash('Venue ' + form.name.data + ' a été mis à jour')
+                return redirect(url_for('venues.show', venue_id=venue_id))
+            else:
+                venue.name = form.name.data
+                venue.city = form.city.data
+                venue.address = form.address.data
+                venue.state = form.state.data
+                venue.phone = form.phone.data
+                venue.genres = form.genres.data
+                venue.facebook_link = form.facebook_link.data
+                venue.image_link = form.image_link.data
+                venue.website_link = form.website_link.data
+                venue.seeking_description = form.seeking_description.data
+                db.session.add(venue)
+                db.session.commit()
+            cache.venue_changed(venue_id)
+            flash('Venue ' + form.name.data + ' a été mis à jour')
+            return redirect(url_for('venues.show', venue_id=venue_id))
+        else:
+            return render_template('forms/edit_venue.html', form=form)
+    except:
+        print(sys.exc_info())
+        db.session.rollback()
+        flash('Venue ' + form.name.data +
+              ' n\'a pas été mise à jour. Une erreur s\'est produite.')
+    finally:
+        db.session.close()
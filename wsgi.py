@@ -0,0 +1,26 @@
+import os
+
+# Production entry point, for gunicorn (see gunicorn.conf.py):
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every worker, and every node behind the load balancer, has to sign
+# sessions and CSRF tokens with the same key, so it must come from the
+# environment rather than be generated per process.
+
+if not os.environ.get('SECRET_KEY'):
+    raise RuntimeError('SECRET_KEY must be set in the environment')
+
+from app import create_app  # noqa: E402
+
+app = create_app()
+# gunicorn imports this once and forks the workers from it (preload_app),
+# so they share the compiled date patterns
+app.extensions['datetime_formatter'].preload()
+# same as `flask assets build`; only bundles whose sources changed since
+# the last build get compressed again
+app.extensions['assets'].build()
+# compile every template up front (from the bytecode cache when it is warm)
+# rather than in each worker on its first requests
+for name in app.jinja_env.list_templates(extensions=['html']):
+    app.jinja_env.get_template(name)